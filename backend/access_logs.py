@@ -0,0 +1,400 @@
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Latency sketch: log-spaced histogram bins from 1 ms to ~65 s, plus under/overflow
+LATENCY_BIN_EDGES = np.logspace(-3, np.log10(65.0), 31)
+LATENCY_BINS = len(LATENCY_BIN_EDGES) + 1
+BATCH_LINES = 50000
+# Objects last modified before the bucket window (minus this slack for late
+# delivery) only hold expired lines and are never downloaded
+LISTING_SLACK_SECONDS = 3600
+
+
+class LocalLogSource:
+    """Gzip access log objects in a local directory, laid out like an S3 prefix."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def list_objects(self, since=0):
+        """Yield ``(key, version, modified)`` for objects modified at or after ``since``."""
+        for root, _, files in os.walk(self.directory):
+            for name in sorted(files):
+                if name.endswith('.gz'):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    if stat.st_mtime >= since:
+                        yield os.path.relpath(path, self.directory), f"{stat.st_size}-{int(stat.st_mtime)}", stat.st_mtime
+
+    def open(self, key):
+        return open(os.path.join(self.directory, key), 'rb')
+
+
+def start_after_key(prefix, log_format, since):
+    """Return a ListObjectsV2 StartAfter key that skips objects dated before ``since``.
+
+    Only possible when the prefix points at a date-ordered key range: an ALB
+    region folder (``.../elasticloadbalancing/<region>/``, keys continue with
+    ``YYYY/MM/DD/``) or a single CloudFront distribution (``.../<distribution
+    id>``, keys continue with ``.YYYY-MM-DD-HH.``). Returns None otherwise.
+    """
+    moment = datetime.fromtimestamp(since, tz=timezone.utc)
+    if log_format == 'alb' and re.search(r'elasticloadbalancing/[^/]+/$', prefix):
+        return prefix + moment.strftime('%Y/%m/%d')
+    if log_format == 'cloudfront' and re.search(r'(^|/)E[A-Z0-9]+\.?$', prefix):
+        return prefix.rstrip('.') + moment.strftime('.%Y-%m-%d-%H')
+    return None
+
+
+class S3LogSource:
+    """Gzip access log objects under an S3 bucket prefix."""
+
+    def __init__(self, s3, bucket, prefix='', log_format='cloudfront'):
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix
+        self.log_format = log_format
+
+    def list_objects(self, since=0):
+        """Yield ``(key, version, modified)`` for objects modified at or after ``since``."""
+        kwargs = {'Bucket': self.bucket, 'Prefix': self.prefix}
+        start_after = start_after_key(self.prefix, self.log_format, since) if since else None
+        if start_after:
+            kwargs['StartAfter'] = start_after
+        paginator = self.s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(**kwargs):
+            for item in page.get('Contents', []):
+                modified = item['LastModified'].timestamp()
+                if item['Key'].endswith('.gz') and modified >= since:
+                    yield item['Key'], item['ETag'], modified
+
+    def open(self, key):
+        # StreamingBody is read incrementally by GzipFile, never as a whole
+        return self.s3.get_object(Bucket=self.bucket, Key=key)['Body']
+
+
+class _MinuteParser:
+    # Timestamp prefixes repeat for every line in a minute, so cache their epoch minute
+    def __init__(self):
+        self._cache = {}
+
+    def minute(self, prefix, fmt):
+        value = self._cache.get(prefix)
+        if value is None:
+            if len(self._cache) > 10000:
+                self._cache.clear()
+            moment = datetime.strptime(prefix, fmt).replace(tzinfo=timezone.utc)
+            value = self._cache[prefix] = int(moment.timestamp()) // 60
+        return value
+
+
+def parse_cloudfront(lines, minutes):
+    """Parse CloudFront standard log lines into (minute, status, bytes, latency) tuples."""
+    fields = {'date': 0, 'time': 1, 'sc-bytes': 3, 'sc-status': 8, 'time-taken': 18}
+    for line in lines:
+        if line.startswith('#'):
+            if line.startswith('#Fields:'):
+                names = line[len('#Fields:'):].split()
+                fields = {name: names.index(name) for name in fields if name in names}
+            continue
+        parts = line.rstrip('\n').split('\t')
+        try:
+            yield (
+                minutes.minute(f"{parts[fields['date']]} {parts[fields['time']][:5]}", '%Y-%m-%d %H:%M'),
+                int(parts[fields['sc-status']]),
+                int(parts[fields['sc-bytes']]),
+                float(parts[fields['time-taken']])
+            )
+        except (IndexError, KeyError, ValueError):
+            continue
+
+
+def parse_alb(lines, minutes):
+    """Parse ALB access log lines into (minute, status, bytes, latency) tuples."""
+    for line in lines:
+        # The first 12 fields never contain spaces; the quoted request follows them
+        parts = line.split(' ', 12)
+        try:
+            latency = float(parts[5]) + float(parts[6]) + float(parts[7])
+            yield (
+                minutes.minute(parts[1][:16], '%Y-%m-%dT%H:%M'),
+                int(parts[8]),
+                int(parts[11]),
+                # -1 processing times mean the request never reached a target
+                latency if latency >= 0 else np.nan
+            )
+        except (IndexError, ValueError):
+            continue
+
+
+PARSERS = {
+    'cloudfront': parse_cloudfront,
+    'alb': parse_alb
+}
+
+
+class MinuteBuckets:
+    """Per-minute request aggregates over a sliding window, held in NumPy arrays.
+
+    Reads and writes hold ``_lock``, so readers never see a batch half applied.
+    """
+
+    def __init__(self, window_minutes=2 * 24 * 60):
+        self.window = window_minutes
+        self._lock = threading.Lock()
+        self.minute = np.full(window_minutes, -1, dtype=np.int64)
+        self.count = np.zeros(window_minutes, dtype=np.int64)
+        self.errors = np.zeros(window_minutes, dtype=np.int64)
+        self.bytes = np.zeros(window_minutes, dtype=np.int64)
+        self.latency_sum = np.zeros(window_minutes)
+        self.latency_count = np.zeros(window_minutes, dtype=np.int64)
+        self.latency_max = np.zeros(window_minutes)
+        self.latency_hist = np.zeros((window_minutes, LATENCY_BINS), dtype=np.int64)
+        self.newest = -1
+
+    ARRAYS = ('minute', 'count', 'errors', 'bytes', 'latency_sum', 'latency_count', 'latency_max', 'latency_hist')
+
+    def to_arrays(self):
+        with self._lock:
+            arrays = {name: getattr(self, name).copy() for name in self.ARRAYS}
+            arrays['newest'] = np.array(self.newest)
+        return arrays
+
+    def load_arrays(self, arrays):
+        """Restore buckets saved by ``to_arrays``; returns False if the window differs."""
+        if arrays['minute'].shape != self.minute.shape or arrays['latency_hist'].shape != self.latency_hist.shape:
+            return False
+        with self._lock:
+            for name in self.ARRAYS:
+                setattr(self, name, arrays[name].copy())
+            self.newest = int(arrays['newest'])
+        return True
+
+    def add(self, minutes, status, sent_bytes, latency):
+        """Fold one batch of parsed lines (parallel arrays) into the buckets."""
+        if not len(minutes):
+            return
+        with self._lock:
+            self._add(minutes, status, sent_bytes, latency)
+
+    def _add(self, minutes, status, sent_bytes, latency):
+        self.newest = max(self.newest, int(minutes.max()))
+        keep = minutes > self.newest - self.window
+        minutes, status, sent_bytes, latency = minutes[keep], status[keep], sent_bytes[keep], latency[keep]
+
+        slots = minutes % self.window
+        # Reset ring slots that still hold an older minute
+        stale = np.unique(slots[self.minute[slots] != minutes])
+        for array in (self.count, self.errors, self.bytes, self.latency_count, self.latency_hist):
+            array[stale] = 0
+        self.latency_sum[stale] = 0
+        self.latency_max[stale] = 0
+        self.minute[slots] = minutes
+
+        np.add.at(self.count, slots, 1)
+        np.add.at(self.errors, slots, status >= 500)
+        np.add.at(self.bytes, slots, sent_bytes)
+        timed = ~np.isnan(latency)
+        np.add.at(self.latency_sum, slots[timed], latency[timed])
+        np.add.at(self.latency_count, slots[timed], 1)
+        np.maximum.at(self.latency_max, slots[timed], latency[timed])
+        np.add.at(self.latency_hist, (slots[timed], np.searchsorted(LATENCY_BIN_EDGES, latency[timed])), 1)
+
+    def series(self, start_minute, end_minute, step_minutes):
+        """Aggregate [start_minute, end_minute) into ``step_minutes`` points."""
+        with self._lock:
+            return self._series(start_minute, end_minute, step_minutes)
+
+    def _series(self, start_minute, end_minute, step_minutes):
+        minutes = np.arange(start_minute, end_minute)
+        slots = minutes % self.window
+        valid = self.minute[slots] == minutes
+        steps = len(minutes) // step_minutes
+        shape = (steps, step_minutes)
+
+        def grouped(array):
+            values = np.where(valid.reshape(-1, *([1] * (array.ndim - 1))), array[slots], 0)
+            return values[:steps * step_minutes].reshape(shape + array.shape[1:]).sum(axis=1)
+
+        count = grouped(self.count)
+        latency_count = grouped(self.latency_count)
+        latency_max = np.where(valid, self.latency_max[slots], 0)[:steps * step_minutes].reshape(shape).max(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {
+                'start': start_minute + np.arange(steps) * step_minutes,
+                'requests': count,
+                'errors': grouped(self.errors),
+                'error_rate': np.where(count > 0, grouped(self.errors) / count * 100, 0.0),
+                'bytes': grouped(self.bytes),
+                'latency_avg': np.where(latency_count > 0, grouped(self.latency_sum) / latency_count, 0.0),
+                'latency_max': latency_max,
+                'latency_p95': _histogram_quantile(grouped(self.latency_hist), 0.95)
+            }
+
+
+def _histogram_quantile(hist, q):
+    # Upper edge of the bin holding the q-quantile, per row
+    totals = hist.sum(axis=1)
+    cumulative = np.cumsum(hist, axis=1)
+    index = (cumulative < (q * totals)[:, None]).sum(axis=1)
+    edges = np.append(LATENCY_BIN_EDGES, LATENCY_BIN_EDGES[-1])
+    return np.where(totals > 0, edges[np.minimum(index, len(edges) - 1)], 0.0)
+
+
+class AccessLogPipeline:
+    """Incrementally ingest gzip access logs into per-minute NumPy buckets.
+
+    Objects are streamed line by line and parsed in batches of BATCH_LINES,
+    which are folded into the buckets together once the object is complete.
+    Only objects modified within the bucket window are listed and
+    downloaded. Each ingested key is remembered with its version (ETag, or
+    size and mtime for local files) until it ages out of the window, so no
+    object is processed twice. With ``state_path`` set, the buckets and the
+    key set are saved together after every ingest and restored on startup.
+    """
+
+    def __init__(self, source, log_format='cloudfront', state_path=None, refresh_interval=60):
+        if log_format not in PARSERS:
+            raise ValueError(f"Unsupported access log format: {log_format}")
+        self.source = source
+        self.parse = PARSERS[log_format]
+        self.state_path = state_path
+        self.refresh_interval = refresh_interval
+        self.buckets = MinuteBuckets()
+        self.ingested = self._load_state()
+        self.last_ingest = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with np.load(self.state_path, allow_pickle=False) as state:
+                if not self.buckets.load_arrays(state):
+                    logger.warning(f"Access log state {self.state_path} has a different window, starting fresh")
+                    return {}
+                return json.loads(str(state['ingested']))
+        except Exception as e:
+            # Includes the old key-only JSON format, which cannot restore the buckets
+            logger.warning(f"Ignoring unreadable access log state {self.state_path}: {e}")
+            return {}
+
+    def _save_state(self):
+        if self.state_path:
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, ingested=np.array(json.dumps(self.ingested)), **self.buckets.to_arrays())
+            os.replace(tmp_path, self.state_path)
+
+    def ingest_object(self, key):
+        # Batches are only merged into the buckets once the whole object has
+        # been read, so an object failing partway is retried without double counting
+        minutes = _MinuteParser()
+        batches = []
+        with self.source.open(key) as raw:
+            text = io.TextIOWrapper(gzip.GzipFile(fileobj=raw), encoding='utf-8', errors='replace')
+            batch = []
+            for record in self.parse(text, minutes):
+                batch.append(record)
+                if len(batch) >= BATCH_LINES:
+                    batches.append(self._to_arrays(batch))
+                    batch = []
+            if batch:
+                batches.append(self._to_arrays(batch))
+        if not batches:
+            return 0
+        self.buckets.add(*(np.concatenate(column) for column in zip(*batches)))
+        return sum(len(arrays[0]) for arrays in batches)
+
+    @staticmethod
+    def _to_arrays(batch):
+        minute, status, sent_bytes, latency = zip(*batch)
+        return (
+            np.fromiter(minute, dtype=np.int64, count=len(batch)),
+            np.fromiter(status, dtype=np.int64, count=len(batch)),
+            np.fromiter(sent_bytes, dtype=np.int64, count=len(batch)),
+            np.fromiter(latency, dtype=float, count=len(batch))
+        )
+
+    def ingest_new(self):
+        """Ingest every object in the window not seen before; returns (objects, lines)."""
+        with self._lock:
+            since = time.time() - self.buckets.window * 60 - LISTING_SLACK_SECONDS
+            objects = lines = 0
+            for key, version, modified in self.source.list_objects(since):
+                seen = self.ingested.get(key)
+                if seen and seen[0] == version:
+                    continue
+                try:
+                    lines += self.ingest_object(key)
+                except Exception as e:
+                    logger.error(f"Access log ingestion failed for {key}: {e}")
+                    continue
+                self.ingested[key] = [version, modified]
+                objects += 1
+
+            expired = [key for key, (_, modified) in self.ingested.items() if modified < since]
+            for key in expired:
+                del self.ingested[key]
+            if objects or expired:
+                self._save_state()
+            self.last_ingest = time.time()
+        if objects:
+            logger.info(f"Ingested {objects} access log objects ({lines} lines)")
+        return objects, lines
+
+    def ensure_loaded(self):
+        """Start a background ingest when the data is older than ``refresh_interval``.
+
+        Covers servers that never call ``start`` (e.g. gunicorn). Never
+        blocks the caller, which serves whatever is loaded so far.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        with self._refresh_lock:
+            if self._refreshing or (self.last_ingest and time.time() - self.last_ingest < self.refresh_interval):
+                return
+            self._refreshing = True
+        threading.Thread(target=self._ingest_once, name='access-log-refresh', daemon=True).start()
+
+    def _ingest_once(self):
+        try:
+            self.ingest_new()
+        except Exception as e:
+            logger.error(f"Access Log Pipeline Error: {e}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing = False
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='access-log-ingest', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.ingest_new()
+            except Exception as e:
+                logger.error(f"Access Log Pipeline Error: {e}")
+            self._stop.wait(self.refresh_interval)
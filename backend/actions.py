@@ -0,0 +1,288 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ('start', 'stop', 'restart')
+FINISHED_STATUSES = ('succeeded', 'failed', 'partial')
+EC2_BATCH_SIZE = 200
+RDS_CONCURRENCY = 5
+RDS_FILTER_SIZE = 100  # describe_db_instances accepts up to 100 filter values
+
+# State each resource must reach before the action counts as done; None means
+# the accepted API call is enough (an EC2 reboot does not change the state)
+TARGET_STATES = {
+    'ec2': {'start': 'running', 'stop': 'stopped', 'restart': None},
+    'rds': {'start': 'available', 'stop': 'stopped', 'restart': 'available'}
+}
+# Actions whose target is also the starting state: the resource has to be
+# seen in another state (e.g. rebooting) before the target counts
+LEAVES_TARGET_FIRST = {('rds', 'restart')}
+EC2_CALLS = {'start': 'start_instances', 'stop': 'stop_instances', 'restart': 'reboot_instances'}
+RDS_CALLS = {'start': 'start_db_instance', 'stop': 'stop_db_instance', 'restart': 'reboot_db_instance'}
+# describe_instances fails the whole call when any one id is unknown
+EC2_UNKNOWN_ID_ERRORS = ('InvalidInstanceID.NotFound', 'InvalidInstanceID.Malformed')
+
+
+class ActionError(ValueError):
+    pass
+
+
+def _error_code(error):
+    # botocore ClientError code, None for anything else
+    return getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+
+def parse_resources(resources):
+    """Normalize ``resources`` into ``[(id, type)]``.
+
+    Entries are either ``{"id": ..., "type": "ec2" | "rds"}`` or bare ids,
+    where ``i-`` prefixed ids are EC2 instances and the rest RDS instances.
+    """
+    parsed = []
+    for resource in resources or []:
+        if isinstance(resource, dict):
+            resource_id, resource_type = resource.get('id'), resource.get('type')
+        else:
+            resource_id = resource
+            resource_type = 'ec2' if str(resource).startswith('i-') else 'rds'
+        if not resource_id or resource_type not in TARGET_STATES:
+            raise ActionError(f"Invalid resource: {resource}")
+        parsed.append((str(resource_id), resource_type))
+    if not parsed:
+        raise ActionError('At least one resource is required')
+    return list(OrderedDict.fromkeys(parsed))
+
+
+class ActionJob:
+    def __init__(self, action, resources):
+        self.id = uuid.uuid4().hex
+        self.action = action
+        self.created = datetime.utcnow().isoformat()
+        self.status = 'pending'
+        self.api_calls = 0
+        self.version = 0
+        self.left_target = set()  # ids seen outside their target state, see LEAVES_TARGET_FIRST
+        self.resources = OrderedDict(
+            (resource_id, {'type': resource_type, 'state': 'queued', 'detail': None, 'error': None})
+            for resource_id, resource_type in resources
+        )
+
+    def to_dict(self):
+        counts = {}
+        for resource in self.resources.values():
+            counts[resource['state']] = counts.get(resource['state'], 0) + 1
+        return {
+            'id': self.id,
+            'action': self.action,
+            'created': self.created,
+            'status': self.status,
+            'version': self.version,
+            'api_calls': self.api_calls,
+            'progress': counts,
+            'resources': [{'id': resource_id, **resource} for resource_id, resource in self.resources.items()]
+        }
+
+
+class ActionJobManager:
+    """Run EC2/RDS start, stop and restart jobs in the background.
+
+    EC2 ids are grouped into batched start/stop/reboot calls of up to
+    EC2_BATCH_SIZE instances, RDS calls run RDS_CONCURRENCY at a time. Each
+    resource is then polled until it reaches its target state, and every
+    change bumps the job version so ``wait_for_change`` can stream progress.
+    """
+
+    def __init__(self, max_jobs=4, history_limit=100, poll_interval=5, timeout=900):
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.history_limit = history_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix='action-job')
+        self._jobs = OrderedDict()
+        self._changed = threading.Condition()
+
+    def submit(self, ec2, rds, action, resources):
+        if action not in ACTIONS:
+            raise ActionError(f"Unsupported action: {action}")
+        job = ActionJob(action, parse_resources(resources))
+        with self._changed:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history_limit:
+                self._jobs.popitem(last=False)
+        self._executor.submit(self._run, job, ec2, rds)
+        logger.info(f"Queued {action} job {job.id} for {len(job.resources)} resources")
+        return job.to_dict()
+
+    def get(self, job_id):
+        with self._changed:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def wait_for_change(self, job_id, version, timeout=15):
+        """Block until the job moves past ``version``; returns its snapshot or None."""
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            self._changed.wait_for(lambda: job.version > version, timeout=timeout)
+            return job.to_dict()
+
+    def _update(self, job, resource_ids, state, detail=None, error=None, calls=0):
+        with self._changed:
+            for resource_id in resource_ids:
+                resource = job.resources[resource_id]
+                resource['state'] = state
+                if detail is not None:
+                    resource['detail'] = detail
+                resource['error'] = error
+            job.api_calls += calls
+            job.version += 1
+            self._changed.notify_all()
+
+    def _count_calls(self, job, calls):
+        with self._changed:
+            job.api_calls += calls
+
+    def _set_status(self, job, status):
+        with self._changed:
+            job.status = status
+            job.version += 1
+            self._changed.notify_all()
+
+    def _run(self, job, ec2, rds):
+        self._set_status(job, 'running')
+        try:
+            ec2_ids = [rid for rid, resource in job.resources.items() if resource['type'] == 'ec2']
+            rds_ids = [rid for rid, resource in job.resources.items() if resource['type'] == 'rds']
+
+            for offset in range(0, len(ec2_ids), EC2_BATCH_SIZE):
+                self._request_ec2(job, ec2, ec2_ids[offset:offset + EC2_BATCH_SIZE])
+            if rds_ids:
+                with ThreadPoolExecutor(max_workers=RDS_CONCURRENCY) as pool:
+                    list(pool.map(lambda db_id: self._request_rds(job, rds, db_id), rds_ids))
+
+            self._wait_for_targets(job, ec2, rds)
+        except Exception as e:
+            logger.error(f"Action job {job.id} failed: {e}")
+            pending = [rid for rid, resource in job.resources.items() if resource['state'] not in ('done', 'failed')]
+            self._update(job, pending, 'failed', error=str(e))
+
+        failed = sum(resource['state'] == 'failed' for resource in job.resources.values())
+        status = 'succeeded' if not failed else 'failed' if failed == len(job.resources) else 'partial'
+        self._set_status(job, status)
+        logger.info(f"Action job {job.id} finished: {status}")
+
+    def _request_ec2(self, job, ec2, instance_ids):
+        call = getattr(ec2, EC2_CALLS[job.action])
+        try:
+            call(InstanceIds=instance_ids)
+            self._update(job, instance_ids, 'requested', calls=1)
+            return
+        except Exception as e:
+            if len(instance_ids) == 1:
+                self._update(job, instance_ids, 'failed', error=str(e), calls=1)
+                return
+            # One bad id fails the whole batch; split it so the rest still run
+            logger.warning(f"Batched {job.action} of {len(instance_ids)} instances failed, splitting batch: {e}")
+            self._count_calls(job, 1)
+        middle = len(instance_ids) // 2
+        self._request_ec2(job, ec2, instance_ids[:middle])
+        self._request_ec2(job, ec2, instance_ids[middle:])
+
+    def _request_rds(self, job, rds, db_id):
+        try:
+            getattr(rds, RDS_CALLS[job.action])(DBInstanceIdentifier=db_id)
+            self._update(job, [db_id], 'requested', calls=1)
+        except Exception as e:
+            self._update(job, [db_id], 'failed', error=str(e), calls=1)
+
+    def _wait_for_targets(self, job, ec2, rds):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            waiting = {
+                rid: resource for rid, resource in job.resources.items()
+                if resource['state'] in ('requested', 'waiting')
+            }
+            # Resources without a target state are done once the call was accepted
+            for rid, resource in list(waiting.items()):
+                if TARGET_STATES[resource['type']][job.action] is None:
+                    self._update(job, [rid], 'done')
+                    del waiting[rid]
+            if not waiting:
+                return
+            if time.monotonic() > deadline:
+                self._update(job, list(waiting), 'failed', error='Timed out waiting for target state')
+                return
+
+            ec2_ids = [rid for rid, resource in waiting.items() if resource['type'] == 'ec2']
+            for offset in range(0, len(ec2_ids), EC2_BATCH_SIZE):
+                self._poll_ec2(job, ec2, ec2_ids[offset:offset + EC2_BATCH_SIZE])
+
+            rds_ids = [rid for rid, resource in waiting.items() if resource['type'] == 'rds']
+            for offset in range(0, len(rds_ids), RDS_FILTER_SIZE):
+                chunk = rds_ids[offset:offset + RDS_FILTER_SIZE]
+                try:
+                    response = rds.describe_db_instances(Filters=[{'Name': 'db-instance-id', 'Values': chunk}])
+                except Exception as e:
+                    # e.g. throttling; the chunk is polled again on the next interval
+                    logger.warning(f"Polling {len(chunk)} RDS instances for job {job.id} failed, retrying: {e}")
+                    self._count_calls(job, 1)
+                    continue
+                states = {db['DBInstanceIdentifier']: db['DBInstanceStatus'] for db in response['DBInstances']}
+                self._record_states(job, 'rds', chunk, states, calls=1)
+
+            time.sleep(self.poll_interval)
+
+    def _poll_ec2(self, job, ec2, instance_ids):
+        try:
+            response = ec2.describe_instances(InstanceIds=instance_ids)
+        except Exception as e:
+            if _error_code(e) not in EC2_UNKNOWN_ID_ERRORS:
+                # e.g. throttling; the chunk is polled again on the next interval
+                logger.warning(f"Polling {len(instance_ids)} instances for job {job.id} failed, retrying: {e}")
+                self._count_calls(job, 1)
+                return
+            if len(instance_ids) == 1:
+                self._update(job, instance_ids, 'failed', error=str(e), calls=1)
+                return
+            # One unknown id (e.g. terminated mid-job) fails the whole call; split it like _request_ec2
+            self._count_calls(job, 1)
+            middle = len(instance_ids) // 2
+            self._poll_ec2(job, ec2, instance_ids[:middle])
+            self._poll_ec2(job, ec2, instance_ids[middle:])
+            return
+        states = {
+            instance['InstanceId']: instance['State']['Name']
+            for reservation in response['Reservations']
+            for instance in reservation['Instances']
+        }
+        self._record_states(job, 'ec2', instance_ids, states, calls=1)
+
+    def _record_states(self, job, resource_type, resource_ids, states, calls):
+        target = TARGET_STATES[resource_type][job.action]
+        if (resource_type, job.action) in LEAVES_TARGET_FIRST:
+            # A reboot polled before it began still reports the target state
+            job.left_target.update(rid for rid in resource_ids if rid in states and states[rid] != target)
+            done = [rid for rid in resource_ids if states.get(rid) == target and rid in job.left_target]
+        else:
+            done = [rid for rid in resource_ids if states.get(rid) == target]
+        with self._changed:
+            job.api_calls += calls
+            changed = False
+            for rid in resource_ids:
+                resource = job.resources[rid]
+                if rid not in done and rid in states and (resource['state'], resource['detail']) != ('waiting', states[rid]):
+                    resource['state'] = 'waiting'
+                    resource['detail'] = states[rid]
+                    changed = True
+            if changed:
+                job.version += 1
+                self._changed.notify_all()
+        # Only bump the version (and send a stream event) when something finished
+        if done:
+            self._update(job, done, 'done', detail=target)
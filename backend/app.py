@@ -1,14 +1,33 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 import boto3
+from botocore.config import Config
 from dotenv import load_dotenv
 import os
 import logging
-from datetime import datetime, timedelta
-import random
+from datetime import datetime, timedelta, timezone
+import threading
+import hmac
 import requests
 from urllib.parse import urlparse
 import time
+import json
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from access_logs import AccessLogPipeline, LocalLogSource, S3LogSource
+from actions import FINISHED_STATUSES, ActionError, ActionJobManager
+from cloudwatch_batch import fetch_metric_data, metric_query
+from deadline import Deadline, DeadlineError, SectionCache, run_sections
+from disk_forecast import fit_trends, time_to_full
+from export import (
+    DEFAULT_CHUNK_ROWS, MAX_CHUNK_ROWS, PARQUET_AVAILABLE, ExportError,
+    csv_stream, iter_log_chunks, iter_metric_chunks, parquet_stream, parse_series
+)
+from inventory import InstanceInventory
+from log_patterns import LogTemplateMiner
+from metric_catalog import MetricCatalog
+from metric_planner import MetricPlanner, MetricSpec, as_datapoints
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,84 +39,221 @@ CORS(app, resources={
     r"/api/*": {
         "origins": ["http://localhost:3000"],
         "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type"]
+        "allow_headers": ["Content-Type", "Authorization"]
     }
 })
 
+# Shared across requests; AWSMonitor itself is created per request
+ec2_inventory = InstanceInventory()
+INVENTORY_MAX_AGE = 30  # seconds
+MONITORED_WEBSITES = [
+    'your-website1.com',
+    'your-website2.com'
+    # Add your websites here
+]
+SERVER_METRIC_SECTIONS = ('cpu', 'memory', 'disk', 'network')
+LOG_PATTERN_MAX_EVENTS = 200000  # upper bound on events clustered per ?mode=patterns request
+
+# Default latency budgets (ms) for routes that return partial results; override with ?deadline_ms=
+ROUTE_DEADLINES_MS = {
+    'status': 5000,
+    'metrics_all': 3000,
+    'server_metrics': 3000
+}
+# Extra time AWS calls get past the request deadline so late sections can still warm the cache
+DEADLINE_GRACE_SECONDS = 10
+# Sections still running after their deadline finish here and refresh section_cache
+section_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='aws-section')
+section_cache = SectionCache()
+
+# Background EC2/RDS start/stop/restart jobs behind /api/actions
+action_jobs = ActionJobManager()
+
+# Refreshed in the background, see MetricCatalog.start in __main__
+metric_catalog = MetricCatalog(['AWS/EC2', 'CWAgent', 'AWS/RDS', 'AWS/ApiGateway'])
+
+# Merges metric requests from concurrent handlers into packed GetMetricData calls
+metric_planner = MetricPlanner()
+
+# CWAgent disk series per volume: response key -> MetricName
+DISK_METRICS = {
+    'used_percent': 'disk_used_percent',
+    'used': 'disk_used',
+    'free': 'disk_free'
+}
+
+# Per-database series fetched for /api/db-metrics: response key -> (MetricName, Stat)
+RDS_FLEET_METRICS = {
+    'read_latency': ('ReadLatency', 'Average'),
+    'write_latency': ('WriteLatency', 'Average'),
+    'read_iops': ('ReadIOPS', 'Average'),
+    'write_iops': ('WriteIOPS', 'Average'),
+    'cpu': ('CPUUtilization', 'Average'),
+    'connections': ('DatabaseConnections', 'Average'),
+    'free_storage': ('FreeStorageSpace', 'Minimum')
+}
+FLEET_PERCENTILES = (50, 90, 99)
+
+# CloudFront/ALB access logs behind /api/website-performance, configured with
+# ACCESS_LOG_BUCKET + ACCESS_LOG_PREFIX (or ACCESS_LOG_DIR for a local copy),
+# ACCESS_LOG_FORMAT (cloudfront or alb) and ACCESS_LOG_STATE (file persisting the
+# minute buckets and ingested-object keys across restarts)
+access_log_pipeline = None
+_access_log_lock = threading.Lock()
+
+def get_access_log_pipeline(s3):
+    global access_log_pipeline
+    with _access_log_lock:
+        if access_log_pipeline is None:
+            directory = os.getenv('ACCESS_LOG_DIR')
+            bucket = os.getenv('ACCESS_LOG_BUCKET')
+            if directory:
+                source = LocalLogSource(directory)
+            elif bucket:
+                source = S3LogSource(s3, bucket, os.getenv('ACCESS_LOG_PREFIX', ''), os.getenv('ACCESS_LOG_FORMAT', 'cloudfront'))
+            else:
+                return None
+            access_log_pipeline = AccessLogPipeline(
+                source,
+                log_format=os.getenv('ACCESS_LOG_FORMAT', 'cloudfront'),
+                state_path=os.getenv('ACCESS_LOG_STATE')
+            )
+        return access_log_pipeline
+
+def disk_forecast_args(args):
+    # days/period/top/instance_id query parameters for /api/disk-forecast; ValueError on bad input
+    options = {'instance_id': args.get('instance_id') or None}
+    for name, default in (('days', 7), ('period', 3600), ('top', 20)):
+        try:
+            options[name] = int(args.get(name, default))
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be an integer")
+        if options[name] <= 0:
+            raise ValueError(f"{name} must be positive")
+    return options
+
+def _nan_to_none(values):
+    return [None if np.isnan(value) else round(float(value), 6) for value in values]
+
+def _average_datapoints(series_list):
+    # Collapse several (timestamp, value) series into Datapoints averaged per timestamp
+    buckets = {}
+    for series in series_list:
+        for timestamp, value in series:
+            buckets.setdefault(timestamp, []).append(value)
+    return [
+        {'Timestamp': timestamp, 'Average': sum(values) / len(values)}
+        for timestamp, values in sorted(buckets.items())
+    ]
+
 class AWSMonitor:
-    def __init__(self):
+    def __init__(self, deadline=None, raise_errors=False):
+        # raise_errors makes the section getters raise instead of returning
+        # empty results, so deadline sections can tell a failure from no data
+        self.raise_errors = raise_errors
+        self.deadline = deadline
         try:
-            self.ec2 = boto3.client('ec2')
-            self.rds = boto3.client('rds')
-            self.logs = boto3.client('logs')
-            self.cloudwatch = boto3.client('cloudwatch')
-            self.cloudfront = boto3.client('cloudfront')
+            config = None
+            if deadline is not None:
+                # Bound every AWS call made for this request by its latency budget
+                timeout = deadline.remaining() + DEADLINE_GRACE_SECONDS
+                config = Config(
+                    connect_timeout=min(timeout, 5),
+                    read_timeout=timeout,
+                    retries={'max_attempts': 2, 'mode': 'standard'}
+                )
+            self.ec2 = boto3.client('ec2', config=config)
+            self.rds = boto3.client('rds', config=config)
+            self.logs = boto3.client('logs', config=config)
+            self.cloudwatch = boto3.client('cloudwatch', config=config)
+            self.s3 = boto3.client('s3', config=config)
             logger.info("AWS clients initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize AWS clients: {e}")
             raise
 
-    def get_ec2_status(self):
+    def fetch_metrics(self, specs):
+        # Deadline-bounded requests skip the shared planner tick: their series go
+        # out at once on this monitor's own bounded client, in a call of their own
+        if self.deadline is not None:
+            return metric_planner.fetch_now(self.cloudwatch, specs)
+        return metric_planner.fetch(self.cloudwatch, specs)
+
+    def refresh_ec2_inventory(self, force=False):
+        try:
+            if not force and not ec2_inventory.is_stale(INVENTORY_MAX_AGE):
+                return None
+            logger.info("Refreshing EC2 inventory")
+            paginator = self.ec2.get_paginator('describe_instances')
+            instances = []
+            for page in paginator.paginate():
+                for reservation in page['Reservations']:
+                    instances.extend(reservation['Instances'])
+
+            diff = ec2_inventory.apply_snapshot(instances)
+            logger.info(
+                f"EC2 inventory v{ec2_inventory.version}: {len(instances)} instances, "
+                f"{len(diff['added'])} added, {len(diff['removed'])} removed, "
+                f"{len(diff['state_changed'])} state changes"
+            )
+            return diff
+        except Exception as e:
+            logger.error(f"EC2 Inventory Error: {e}")
+            if self.raise_errors:
+                raise
+            return None
+
+    def get_ec2_status(self, state=None, instance_type=None, az=None, tags=None):
         try:
             logger.info("Fetching EC2 instances")
-            instances = self.ec2.describe_instances()
-            result = []
-            
-            for reservation in instances['Reservations']:
-                for instance in reservation['Instances']:
-                    # Get CPU utilization for this instance
-                    end_time = datetime.utcnow()
-                    start_time = end_time - timedelta(minutes=5)
-                    
-                    cpu_stats = self.cloudwatch.get_metric_statistics(
-                        Namespace='AWS/EC2',
-                        MetricName='CPUUtilization',
-                        Dimensions=[
-                            {
-                                'Name': 'InstanceId',
-                                'Value': instance['InstanceId']
-                            }
-                        ],
-                        StartTime=start_time,
-                        EndTime=end_time,
-                        Period=300,  # 5 minutes
-                        Statistics=['Average']
-                    )
-                    
-                    # Get the latest CPU utilization value
-                    cpu_utilization = None
-                    if cpu_stats['Datapoints']:
-                        latest_datapoint = max(cpu_stats['Datapoints'], key=lambda x: x['Timestamp'])
-                        cpu_utilization = round(latest_datapoint['Average'], 2)
-                    
-                    instance_data = {
-                        'id': instance['InstanceId'],
-                        'state': instance['State']['Name'],
-                        'type': instance['InstanceType'],
-                        'launch_time': instance['LaunchTime'].isoformat() if 'LaunchTime' in instance else None,
-                        'cpuUtilization': cpu_utilization
-                    }
-                    result.append(instance_data)
-                    
+            self.refresh_ec2_inventory()
+            result = ec2_inventory.query(state=state, instance_type=instance_type, az=az, tags=tags)
+
+            # Latest CPU for every instance through one planned batch
+            cpu_specs = {
+                instance_data['id']: MetricSpec(
+                    'AWS/EC2', 'CPUUtilization', 'Average', minutes=5,
+                    dimensions=(('InstanceId', instance_data['id']),)
+                )
+                for instance_data in result
+            }
+            cpu_results = self.fetch_metrics(cpu_specs.values()) if cpu_specs else {}
+            for instance_data in result:
+                datapoints = cpu_results.get(cpu_specs[instance_data['id']])
+                instance_data['cpuUtilization'] = round(datapoints[-1][1], 2) if datapoints else None
+
             logger.info(f"Found {len(result)} EC2 instances")
             return result
         except Exception as e:
             logger.error(f"EC2 Error: {e}")
+            if self.raise_errors:
+                raise
             return []
 
+    def describe_db_instances(self):
+        paginator = self.rds.get_paginator('describe_db_instances')
+        databases = []
+        for page in paginator.paginate():
+            databases.extend(page['DBInstances'])
+        return databases
+
     def get_rds_status(self):
         try:
             logger.info("Fetching RDS instances")
-            databases = self.rds.describe_db_instances()
             result = [{
                 'id': db['DBInstanceIdentifier'],
                 'status': db['DBInstanceStatus'],
-                'engine': db['Engine']
-            } for db in databases['DBInstances']]
+                'engine': db['Engine'],
+                'instance_class': db.get('DBInstanceClass'),
+                'az': db.get('AvailabilityZone'),
+                'allocated_storage': db.get('AllocatedStorage')
+            } for db in self.describe_db_instances()]
             logger.info(f"Found {len(result)} RDS instances")
             return result
         except Exception as e:
             logger.error(f"RDS Error: {e}")
+            if self.raise_errors:
+                raise
             return []
 
     def get_log_groups(self):
@@ -134,6 +290,35 @@ class AWSMonitor:
             logger.error(f"Log Events Error: {e}")
             return []
 
+    def get_log_patterns(self, log_group_name, start_time=None, filter_pattern=None, max_events=LOG_PATTERN_MAX_EVENTS):
+        try:
+            logger.info(f"Mining log templates from {log_group_name}")
+            kwargs = {'logGroupName': log_group_name}
+            if start_time:
+                kwargs['startTime'] = start_time
+            if filter_pattern:
+                kwargs['filterPattern'] = filter_pattern
+
+            # Events are clustered page by page, so only the templates stay in memory
+            miner = LogTemplateMiner()
+            paginator = self.logs.get_paginator('filter_log_events')
+            for page in paginator.paginate(**kwargs):
+                for event in page['events']:
+                    miner.add(event['message'], event['timestamp'])
+                if miner.lines >= max_events:
+                    break
+
+            templates = miner.templates()
+            logger.info(f"Clustered {miner.lines} log events into {len(templates)} templates")
+            return {
+                'lines': miner.lines,
+                'truncated': miner.lines >= max_events,
+                'templates': templates
+            }
+        except Exception as e:
+            logger.error(f"Log Patterns Error: {e}")
+            return {'lines': 0, 'truncated': False, 'templates': []}
+
     def monitor_website(self, url):
         try:
             logger.info(f"Monitoring website: {url}")
@@ -191,266 +376,322 @@ class AWSMonitor:
     def get_cpu_utilization(self):
         try:
             logger.info("Fetching CPU utilization metrics")
-            end_time = datetime.utcnow()
-            start_time = end_time - timedelta(minutes=5)  # Last 5 minutes of data
-
-            response = self.cloudwatch.get_metric_statistics(
-                Namespace='AWS/EC2',
-                MetricName='CPUUtilization',
-                Dimensions=[],  # Empty list to get all instances
-                StartTime=start_time,
-                EndTime=end_time,
-                Period=300,  # 5-minute periods
-                Statistics=['Average']
-            )
+            spec = MetricSpec('AWS/EC2', 'CPUUtilization', 'Average', minutes=5)  # Last 5 minutes of data
+            results = self.fetch_metrics([spec])
 
             # Process the metrics data
             metrics = [{
-                'timestamp': datapoint['Timestamp'].isoformat(),
-                'average': datapoint['Average']
-            } for datapoint in response['Datapoints']]
+                'timestamp': timestamp.isoformat(),
+                'average': value
+            } for timestamp, value in results[spec]]
 
             logger.info(f"Retrieved {len(metrics)} CPU utilization datapoints")
             return metrics
         except Exception as e:
             logger.error(f"CPU Utilization Error: {e}")
+            if self.raise_errors:
+                raise
             return []
 
     def get_memory_utilization(self):
         try:
             logger.info("Fetching Memory utilization metrics")
-            end_time = datetime.utcnow()
-            start_time = end_time - timedelta(minutes=5)
-
-            response = self.cloudwatch.get_metric_statistics(
-                Namespace='AWS/EC2',
-                MetricName='MemoryUtilization',
-                Dimensions=[],
-                StartTime=start_time,
-                EndTime=end_time,
-                Period=300,
-                Statistics=['Average']
-            )
-            return response['Datapoints']
+            spec = MetricSpec('AWS/EC2', 'MemoryUtilization', 'Average', minutes=5)
+            results = self.fetch_metrics([spec])
+            return as_datapoints({'Average': results[spec]})
         except Exception as e:
             logger.error(f"Memory Utilization Error: {e}")
+            if self.raise_errors:
+                raise
             return []
 
     def get_network_metrics(self):
         try:
             logger.info("Fetching Network metrics")
-            end_time = datetime.utcnow()
-            start_time = end_time - timedelta(minutes=5)
-
-            metrics = {}
-            for metric in ['NetworkIn', 'NetworkOut']:
-                response = self.cloudwatch.get_metric_statistics(
-                    Namespace='AWS/EC2',
-                    MetricName=metric,
-                    Dimensions=[],
-                    StartTime=start_time,
-                    EndTime=end_time,
-                    Period=300,
-                    Statistics=['Average']
-                )
-                metrics[metric] = response['Datapoints']
-            return metrics
+            specs = {
+                metric: MetricSpec('AWS/EC2', metric, 'Average', minutes=5)
+                for metric in ['NetworkIn', 'NetworkOut']
+            }
+            results = self.fetch_metrics(specs.values())
+            return {
+                metric: as_datapoints({'Average': results[spec]})
+                for metric, spec in specs.items()
+            }
         except Exception as e:
             logger.error(f"Network Metrics Error: {e}")
+            if self.raise_errors:
+                raise
             return {}
 
     def get_disk_metrics(self):
         try:
             logger.info("Fetching disk space metrics")
+            metric_catalog.ensure_loaded(self.cloudwatch)
             end_time = datetime.utcnow()
             start_time = end_time - timedelta(minutes=30)
 
-            # Get disk space utilization
-            disk_used = self.cloudwatch.get_metric_statistics(
-                Namespace='AWS/EC2',
-                MetricName='DiskSpaceUtilization',
-                Dimensions=[
-                    {
-                        'Name': 'InstanceId',
-                        'Value': 'i-0f243abfe9666ad29'  # Replace with your instance ID
-                    },
-                    {
-                        'Name': 'Filesystem',
-                        'Value': '/dev/xvda1'  # Replace with your filesystem
-                    },
-                    {
-                        'Name': 'MountPath',
-                        'Value': '/'
-                    }
-                ],
-                StartTime=start_time,
-                EndTime=end_time,
-                Period=300,
-                Statistics=['Average']
+            # Expand every instance/mount the agent publishes from the catalog
+            volumes = []
+            volume_index = {}
+            query_targets = {}
+            queries = []
+            for key, metric_name in DISK_METRICS.items():
+                for namespace, name, dimensions in metric_catalog.find('CWAgent', metric_name, require=('InstanceId', 'path')):
+                    volume_key = tuple(d for d in dimensions if d[0] in ('InstanceId', 'path', 'device', 'fstype'))
+                    if volume_key not in volume_index:
+                        volume_index[volume_key] = len(volumes)
+                        volumes.append(volume_key)
+                    query_id = f"disk{len(queries)}"
+                    query_targets[query_id] = (volume_index[volume_key], key)
+                    queries.append(metric_query(query_id, namespace, name, dimensions))
+
+            results, _ = fetch_metric_data(self.cloudwatch, queries, start_time, end_time)
+            # A volume can be published under several dimension sets (e.g. with
+            # ImageId/InstanceType appended); merge them into one series per
+            # volume, ordered by timestamp so [-1] is the latest point
+            merged = {}
+            for query_id, points in results.items():
+                merged.setdefault(query_targets[query_id], {}).update(points)
+            series = {target: sorted(points.items()) for target, points in merged.items()}
+
+            result_volumes = []
+            for index, volume_key in enumerate(volumes):
+                dims = dict(volume_key)
+                latest = {
+                    key: (series[(index, key)][-1][1] if series.get((index, key)) else None)
+                    for key in DISK_METRICS
+                }
+                total = latest['used'] + latest['free'] if latest['used'] is not None and latest['free'] is not None else None
+                result_volumes.append({
+                    'instance_id': dims.get('InstanceId'),
+                    'path': dims.get('path'),
+                    'device': dims.get('device'),
+                    'fstype': dims.get('fstype'),
+                    'used_percent': latest['used_percent'],
+                    'used': latest['used'],
+                    'free': latest['free'],
+                    'total': total,
+                    'history': [
+                        {'timestamp': timestamp.isoformat(), 'value': value}
+                        for timestamp, value in series.get((index, 'used_percent'), [])
+                    ]
+                })
+
+            # Keep the single-volume fields, reported for the first root volume
+            primary = next((i for i, v in enumerate(result_volumes) if v['path'] == '/'), 0 if result_volumes else None)
+            disk_used = [
+                {'Timestamp': timestamp, 'Average': value}
+                for timestamp, value in series.get((primary, 'used'), [])
+            ]
+            disk_available = [
+                {'Timestamp': timestamp, 'Average': value}
+                for timestamp, value in series.get((primary, 'free'), [])
+            ]
+            total_size = result_volumes[primary]['total'] if primary is not None else None
+
+            return {
+                'volumes': result_volumes,
+                'disk_used': disk_used,
+                'disk_available': disk_available,
+                'total_size': total_size or 0
+            }
+        except Exception as e:
+            logger.error(f"Disk Metrics Error: {e}")
+            if self.raise_errors:
+                raise
+            return {}
+
+    def get_disk_forecast(self, days=7, period=3600, top=20, instance_id=None):
+        try:
+            logger.info("Forecasting disk exhaustion")
+            metric_catalog.ensure_loaded(self.cloudwatch)
+            volumes = metric_catalog.find(
+                'CWAgent', 'disk_used_percent',
+                dimensions={'InstanceId': instance_id} if instance_id else None, require=('InstanceId', 'path')
             )
 
-            # Get disk space available
-            disk_available = self.cloudwatch.get_metric_statistics(
-                Namespace='AWS/EC2',
-                MetricName='DiskSpaceAvailable',
-                Dimensions=[
-                    {
-                        'Name': 'InstanceId',
-                        'Value': 'i-0f243abfe9666ad29'  # Replace with your instance ID
-                    },
-                    {
-                        'Name': 'Filesystem',
-                        'Value': '/dev/xvda1'  # Replace with your filesystem
-                    },
-                    {
-                        'Name': 'MountPath',
-                        'Value': '/'
-                    }
-                ],
-                StartTime=start_time,
-                EndTime=end_time,
-                Period=300,
-                Statistics=['Average']
+            end_time = datetime.utcnow().replace(tzinfo=timezone.utc)
+            start_epoch = (int(end_time.timestamp()) - days * 86400) // period * period
+            steps = int((end_time.timestamp() - start_epoch) // period) + 1
+            queries = [
+                metric_query(f"vol{index}", namespace, name, dimensions, period=period)
+                for index, (namespace, name, dimensions) in enumerate(volumes)
+            ]
+            results, calls = fetch_metric_data(
+                self.cloudwatch, queries, datetime.fromtimestamp(start_epoch, tz=timezone.utc), end_time
             )
 
+            usage = np.full((len(volumes), steps), np.nan)
+            for index in range(len(volumes)):
+                for timestamp, value in results[f"vol{index}"]:
+                    step = int((timestamp.timestamp() - start_epoch) // period)
+                    if 0 <= step < steps:
+                        usage[index, step] = value
+
+            # Catalogued volumes without datapoints in the window have nothing to fit
+            reporting = np.flatnonzero(~np.isnan(usage).all(axis=1))
+            timestamps = start_epoch + np.arange(steps, dtype=float) * period
+            fit = fit_trends(timestamps, usage[reporting])
+            days_to_full, days_low, days_high, confidence = time_to_full(fit)
+
+            def finite(value):
+                return round(float(value), 2) if np.isfinite(value) else None
+
+            at_risk = np.flatnonzero(np.isfinite(days_to_full))
+            ranked = at_risk[np.argsort(days_to_full[at_risk], kind='stable')][:top]
+            forecasts = []
+            for index in ranked:
+                dims = dict(volumes[reporting[index]][2])
+                forecasts.append({
+                    'instance_id': dims.get('InstanceId'),
+                    'path': dims.get('path'),
+                    'device': dims.get('device'),
+                    'used_percent': finite(fit['level'][index]),
+                    'growth_per_day': finite(fit['slope'][index] * 86400),
+                    'days_to_full': finite(days_to_full[index]),
+                    'days_to_full_low': finite(days_low[index]),
+                    'days_to_full_high': finite(days_high[index]),
+                    'confidence': finite(confidence[index])
+                })
+
+            logger.info(f"Forecast {len(volumes)} volumes in {calls} GetMetricData calls, {len(at_risk)} growing")
             return {
-                'disk_used': disk_used['Datapoints'],
-                'disk_available': disk_available['Datapoints'],
-                'total_size': sum(point['Average'] for point in disk_used['Datapoints'] + disk_available['Datapoints']) if disk_used['Datapoints'] and disk_available['Datapoints'] else 0
+                'volumes_analyzed': len(volumes),
+                'volumes_reporting': int(reporting.size),
+                'volumes_growing': int(at_risk.size),
+                'history_days': days,
+                'forecasts': forecasts
             }
         except Exception as e:
-            logger.error(f"Disk Metrics Error: {e}")
+            logger.error(f"Disk Forecast Error: {e}")
             return {}
 
     def get_cloud_metrics(self):
         try:
-            end_time = datetime.utcnow()
-            start_time = end_time - timedelta(minutes=30)
-            
-            metrics = {
-                'compute': self.cloudwatch.get_metric_statistics(
-                    Namespace='AWS/EC2',
-                    MetricName='CPUUtilization',
-                    StartTime=start_time,
-                    EndTime=end_time,
-                    Period=300,
-                    Statistics=['Average']
-                ),
-                'memory': self.cloudwatch.get_metric_statistics(
-                    Namespace='AWS/EC2',
-                    MetricName='MemoryUtilization',
-                    StartTime=start_time,
-                    EndTime=end_time,
-                    Period=300,
-                    Statistics=['Average']
-                ),
-                'network': self.cloudwatch.get_metric_statistics(
-                    Namespace='AWS/EC2',
-                    MetricName='NetworkIn',
-                    StartTime=start_time,
-                    EndTime=end_time,
-                    Period=300,
-                    Statistics=['Sum']
-                )
+            specs = {
+                'compute': MetricSpec('AWS/EC2', 'CPUUtilization', 'Average', minutes=30),
+                'memory': MetricSpec('AWS/EC2', 'MemoryUtilization', 'Average', minutes=30),
+                'network': MetricSpec('AWS/EC2', 'NetworkIn', 'Sum', minutes=30)
+            }
+            results = self.fetch_metrics(specs.values())
+            return {
+                key: {'Datapoints': as_datapoints({spec.stat: results[spec]})}
+                for key, spec in specs.items()
             }
-            return metrics
         except Exception as e:
             logger.error(f"Cloud Metrics Error: {e}")
             return {}
 
-    def get_db_latency_metrics(self):
+    def get_db_fleet_metrics(self, minutes=30, period=300):
         try:
-            logger.info("Fetching database latency metrics")
-            end_time = datetime.utcnow()
-            start_time = end_time - timedelta(minutes=30)
+            logger.info("Fetching fleet-wide database metrics")
+            databases = self.describe_db_instances()
+            db_ids = [db['DBInstanceIdentifier'] for db in databases]
 
-            # Get RDS latency metrics
-            latency_metrics = self.cloudwatch.get_metric_statistics(
-                Namespace='AWS/RDS',
-                MetricName='ReadLatency',
-                Dimensions=[
-                    {
-                        'Name': 'DBInstanceIdentifier',
-                        'Value': 'p2p-exchange'  # Replace with your DB identifier
-                    }
-                ],
-                StartTime=start_time,
-                EndTime=end_time,
-                Period=300,
-                Statistics=['Average']
-            )
+            end_time = datetime.utcnow().replace(tzinfo=timezone.utc)
+            start_epoch = (int(end_time.timestamp()) - minutes * 60) // period * period
+            start_time = datetime.fromtimestamp(start_epoch, tz=timezone.utc)
+            steps = int((end_time.timestamp() - start_epoch) // period) + 1
 
-            # Get write latency as well
-            write_latency = self.cloudwatch.get_metric_statistics(
-                Namespace='AWS/RDS',
-                MetricName='WriteLatency',
-                Dimensions=[
-                    {
-                        'Name': 'DBInstanceIdentifier',
-                        'Value': 'p2p-exchange'  # Replace with your DB identifier
-                    }
-                ],
-                StartTime=start_time,
-                EndTime=end_time,
-                Period=300,
-                Statistics=['Average']
-            )
+            queries = [
+                metric_query(
+                    f"db{index}_{key}", 'AWS/RDS', metric_name,
+                    [('DBInstanceIdentifier', db_id)], period=period, stat=stat
+                )
+                for index, db_id in enumerate(db_ids)
+                for key, (metric_name, stat) in RDS_FLEET_METRICS.items()
+            ]
+            results, calls = fetch_metric_data(self.cloudwatch, queries, start_time, end_time)
+
+            metrics = {}
+            fleet = {}
+            for key in RDS_FLEET_METRICS:
+                matrix = np.full((len(db_ids), steps), np.nan)
+                for index in range(len(db_ids)):
+                    for timestamp, value in results[f"db{index}_{key}"]:
+                        step = int((timestamp.timestamp() - start_epoch) // period)
+                        if 0 <= step < steps:
+                            matrix[index, step] = value
+
+                # Latest non-empty datapoint per database
+                present = ~np.isnan(matrix)
+                last_step = steps - 1 - np.argmax(present[:, ::-1], axis=1)
+                latest = np.where(present.any(axis=1), matrix[np.arange(len(db_ids)), last_step], np.nan)
+
+                metrics[key] = {
+                    'latest': _nan_to_none(latest),
+                    'history': [_nan_to_none(row) for row in matrix]
+                }
+                observed = latest[~np.isnan(latest)]
+                fleet[key] = {'count': int(observed.size)}
+                if observed.size:
+                    for percentile, value in zip(FLEET_PERCENTILES, np.percentile(observed, FLEET_PERCENTILES)):
+                        fleet[key][f"p{percentile}"] = round(float(value), 6)
+                    fleet[key]['max'] = round(float(observed.max()), 6)
 
+            logger.info(f"Fetched metrics for {len(db_ids)} databases in {calls} GetMetricData calls")
             return {
-                'read_latency': latency_metrics['Datapoints'],
-                'write_latency': write_latency['Datapoints']
+                'period': period,
+                'timestamps': [
+                    datetime.fromtimestamp(start_epoch + step * period, tz=timezone.utc).isoformat()
+                    for step in range(steps)
+                ],
+                'databases': [{
+                    'id': db['DBInstanceIdentifier'],
+                    'status': db['DBInstanceStatus'],
+                    'engine': db['Engine'],
+                    'instance_class': db.get('DBInstanceClass')
+                } for db in databases],
+                'metrics': metrics,
+                'fleet': fleet,
+                'calls': calls
             }
         except Exception as e:
-            logger.error(f"Database Latency Metrics Error: {e}")
+            logger.error(f"Database Fleet Metrics Error: {e}")
             return {}
 
-    def get_website_performance(self):
+    def get_website_performance(self, hours=24, step_minutes=30):
         try:
             logger.info("Fetching website performance metrics")
-            end_time = datetime.utcnow()
-            start_time = end_time - timedelta(hours=24)
+            # Round up so the current, still-filling step is included
+            end_minute = (int(time.time()) // 60 // step_minutes + 1) * step_minutes
+            start_minute = end_minute - hours * 60
+            empty = {
+                'responseTime': {'average': [], 'maximum': []},
+                'errorRate': [],
+                'requests': [],
+                'bandwidth': []
+            }
+
+            pipeline = get_access_log_pipeline(self.s3)
+            if pipeline is None:
+                logger.warning("No access log source configured, set ACCESS_LOG_BUCKET or ACCESS_LOG_DIR")
+                return empty
+            pipeline.ensure_loaded()
+            series = pipeline.buckets.series(start_minute, end_minute, step_minutes)
 
-            # Simulated data for testing
-            time_points = []
-            current = start_time
-            while current <= end_time:
-                time_points.append(current)
-                current += timedelta(minutes=30)
+            timestamps = [
+                datetime.utcfromtimestamp(int(minute) * 60).isoformat()
+                for minute in series['start']
+            ]
+
+            def points(values, digits=None):
+                return [
+                    {
+                        'timestamp': timestamp,
+                        'value': round(float(value), digits) if digits is not None else int(value)
+                    } for timestamp, value in zip(timestamps, values)
+                ]
 
-            # Generate sample data
             return {
                 'responseTime': {
-                    'average': [
-                        {
-                            'timestamp': t.isoformat(),
-                            'value': round(random.uniform(0.1, 2.0), 2)
-                        } for t in time_points
-                    ],
-                    'maximum': [
-                        {
-                            'timestamp': t.isoformat(),
-                            'value': round(random.uniform(1.0, 5.0), 2)
-                        } for t in time_points
-                    ]
+                    'average': points(series['latency_avg'], 3),
+                    'maximum': points(series['latency_max'], 3),
+                    'p95': points(series['latency_p95'], 3)
                 },
-                'errorRate': [
-                    {
-                        'timestamp': t.isoformat(),
-                        'value': round(random.uniform(0, 2.0), 2)
-                    } for t in time_points
-                ],
-                'requests': [
-                    {
-                        'timestamp': t.isoformat(),
-                        'value': random.randint(100, 1000)
-                    } for t in time_points
-                ],
-                'bandwidth': [
-                    {
-                        'timestamp': t.isoformat(),
-                        'value': random.randint(1024 * 1024, 10 * 1024 * 1024)  # 1MB to 10MB
-                    } for t in time_points
-                ]
+                'errorRate': points(series['error_rate'], 2),
+                'requests': points(series['requests']),
+                'bandwidth': points(series['bytes'])
             }
         except Exception as e:
             logger.error(f"Website Performance Error: {e}")
@@ -502,144 +743,95 @@ class AWSMonitor:
                 'timestamp': datetime.utcnow().isoformat()
             }
 
-    def get_server_metrics(self):
+    def get_server_metrics(self, sections=SERVER_METRIC_SECTIONS):
         try:
             logger.info("Fetching server metrics")
-            end_time = datetime.utcnow()
-            start_time = end_time - timedelta(hours=1)
-
-            metrics = {
-                'cpu': self.cloudwatch.get_metric_statistics(
-                    Namespace='AWS/EC2',
-                    MetricName='CPUUtilization',
-                    Dimensions=[],
-                    StartTime=start_time,
-                    EndTime=end_time,
-                    Period=300,
-                    Statistics=['Average', 'Maximum']
-                ),
-                'memory': self.cloudwatch.get_metric_statistics(
-                    Namespace='CWAgent',
-                    MetricName='mem_used_percent',
-                    Dimensions=[],
-                    StartTime=start_time,
-                    EndTime=end_time,
-                    Period=300,
-                    Statistics=['Average']
-                ),
-                'disk': self.cloudwatch.get_metric_statistics(
-                    Namespace='CWAgent',
-                    MetricName='disk_used_percent',
-                    Dimensions=[],
-                    StartTime=start_time,
-                    EndTime=end_time,
-                    Period=300,
-                    Statistics=['Average']
-                ),
-                'network': {
-                    'in': self.cloudwatch.get_metric_statistics(
-                        Namespace='AWS/EC2',
-                        MetricName='NetworkIn',
-                        Dimensions=[],
-                        StartTime=start_time,
-                        EndTime=end_time,
-                        Period=300,
-                        Statistics=['Average']
-                    ),
-                    'out': self.cloudwatch.get_metric_statistics(
-                        Namespace='AWS/EC2',
-                        MetricName='NetworkOut',
-                        Dimensions=[],
-                        StartTime=start_time,
-                        EndTime=end_time,
-                        Period=300,
-                        Statistics=['Average']
-                    )
-                }
-            }
+            specs = {}
+            if 'cpu' in sections:
+                specs['cpu_average'] = MetricSpec('AWS/EC2', 'CPUUtilization', 'Average', minutes=60)
+                specs['cpu_maximum'] = MetricSpec('AWS/EC2', 'CPUUtilization', 'Maximum', minutes=60)
+            if 'network' in sections:
+                specs['network_in'] = MetricSpec('AWS/EC2', 'NetworkIn', 'Average', minutes=60)
+                specs['network_out'] = MetricSpec('AWS/EC2', 'NetworkOut', 'Average', minutes=60)
 
-            return {
-                'cpu': {
-                    'current': metrics['cpu']['Datapoints'][-1]['Average'] if metrics['cpu']['Datapoints'] else 0,
-                    'history': [
-                        {
-                            'timestamp': point['Timestamp'].isoformat(),
-                            'value': point['Average']
-                        } for point in metrics['cpu']['Datapoints']
-                    ]
-                },
-                'memory': {
-                    'current': metrics['memory']['Datapoints'][-1]['Average'] if metrics['memory']['Datapoints'] else 0,
-                    'history': [
-                        {
-                            'timestamp': point['Timestamp'].isoformat(),
-                            'value': point['Average']
-                        } for point in metrics['memory']['Datapoints']
-                    ]
-                },
-                'disk': {
-                    'current': metrics['disk']['Datapoints'][-1]['Average'] if metrics['disk']['Datapoints'] else 0,
-                    'history': [
-                        {
-                            'timestamp': point['Timestamp'].isoformat(),
-                            'value': point['Average']
-                        } for point in metrics['disk']['Datapoints']
-                    ]
-                },
-                'network': {
-                    'in': [
-                        {
-                            'timestamp': point['Timestamp'].isoformat(),
-                            'value': point['Average']
-                        } for point in metrics['network']['in']['Datapoints']
-                    ],
-                    'out': [
-                        {
-                            'timestamp': point['Timestamp'].isoformat(),
-                            'value': point['Average']
-                        } for point in metrics['network']['out']['Datapoints']
+            # Agent metrics are only published with dimensions, so expand them from the catalog
+            agent_specs = {}
+            for key, metric_name in (('memory', 'mem_used_percent'), ('disk', 'disk_used_percent')):
+                if key in sections:
+                    metric_catalog.ensure_loaded(self.cloudwatch)
+                    agent_specs[key] = [
+                        MetricSpec(namespace, name, 'Average', minutes=60, dimensions=dimensions)
+                        for namespace, name, dimensions in metric_catalog.find('CWAgent', metric_name)
                     ]
+            results = self.fetch_metrics(
+                list(specs.values()) + [spec for group in agent_specs.values() for spec in group]
+            )
+
+            def history(datapoints, stat='Average'):
+                return [
+                    {
+                        'timestamp': point['Timestamp'].isoformat(),
+                        'value': point.get(stat)
+                    } for point in datapoints
+                ]
+
+            metrics = {}
+            if 'cpu' in sections:
+                datapoints = as_datapoints({
+                    'Average': results[specs['cpu_average']],
+                    'Maximum': results[specs['cpu_maximum']]
+                })
+                metrics['cpu'] = {
+                    'current': datapoints[-1].get('Average', 0) if datapoints else 0,
+                    'history': history(datapoints)
                 }
-            }
+            for key, group in agent_specs.items():
+                datapoints = _average_datapoints(results[spec] for spec in group)
+                metrics[key] = {
+                    'current': datapoints[-1].get('Average', 0) if datapoints else 0,
+                    'history': history(datapoints)
+                }
+            if 'network' in sections:
+                metrics['network'] = {
+                    'in': history(as_datapoints({'Average': results[specs['network_in']]})),
+                    'out': history(as_datapoints({'Average': results[specs['network_out']]}))
+                }
+            return metrics
         except Exception as e:
             logger.error(f"Server Metrics Error: {e}")
+            if self.raise_errors:
+                raise
             return {}
 
     def get_response_time_metrics(self):
         try:
             logger.info("Fetching response time metrics")
-            end_time = datetime.utcnow()
-            start_time = end_time - timedelta(hours=24)
-
+            specs = {
+                'api_latency': {
+                    stat: MetricSpec('AWS/ApiGateway', 'Latency', stat, minutes=24 * 60)
+                    for stat in ('Average', 'Maximum', 'Minimum')
+                },
+                'integration_latency': {
+                    stat: MetricSpec('AWS/ApiGateway', 'IntegrationLatency', stat, minutes=24 * 60)
+                    for stat in ('Average', 'Maximum')
+                },
+                'endpoint1': {
+                    'Average': MetricSpec(
+                        'AWS/ApiGateway', 'Latency', 'Average', minutes=24 * 60,
+                        dimensions=(('ApiName', 'endpoint1'),)
+                    )
+                }
+            }
+            results = self.fetch_metrics([spec for group in specs.values() for spec in group.values()])
+            datapoints = {
+                key: {'Datapoints': as_datapoints({stat: results[spec] for stat, spec in group.items()})}
+                for key, group in specs.items()
+            }
             metrics = {
-                'api_latency': self.cloudwatch.get_metric_statistics(
-                    Namespace='AWS/ApiGateway',
-                    MetricName='Latency',
-                    Dimensions=[],
-                    StartTime=start_time,
-                    EndTime=end_time,
-                    Period=300,
-                    Statistics=['Average', 'Maximum', 'Minimum']
-                ),
-                'integration_latency': self.cloudwatch.get_metric_statistics(
-                    Namespace='AWS/ApiGateway',
-                    MetricName='IntegrationLatency',
-                    Dimensions=[],
-                    StartTime=start_time,
-                    EndTime=end_time,
-                    Period=300,
-                    Statistics=['Average', 'Maximum']
-                ),
+                'api_latency': datapoints['api_latency'],
+                'integration_latency': datapoints['integration_latency'],
                 'endpoint_latency': {
-                    'endpoint1': self.cloudwatch.get_metric_statistics(
-                        Namespace='AWS/ApiGateway',
-                        MetricName='Latency',
-                        Dimensions=[{'Name': 'ApiName', 'Value': 'endpoint1'}],
-                        StartTime=start_time,
-                        EndTime=end_time,
-                        Period=300,
-                        Statistics=['Average']
-                    )
+                    'endpoint1': datapoints['endpoint1']
                 }
             }
 
@@ -689,6 +881,179 @@ class AWSMonitor:
             logger.error(f"Response Time Metrics Error: {e}")
             return {}
 
+# Token required by the mutating /api/actions endpoint, sent as
+# "Authorization: Bearer <token>"; actions stay disabled while it is unset. It
+# lives only here: the dashboard asks the operator for it instead of bundling it
+ACTIONS_API_TOKEN = os.getenv('ACTIONS_API_TOKEN')
+
+def actions_auth_error(headers):
+    """Return ``(message, status)`` when a request may not run actions, else None."""
+    if not ACTIONS_API_TOKEN:
+        return 'Resource actions are disabled, set ACTIONS_API_TOKEN to enable them', 403
+    supplied = headers.get('Authorization', '')
+    if not hmac.compare_digest(supplied.encode(), f"Bearer {ACTIONS_API_TOKEN}".encode()):
+        return 'Invalid or missing API token', 401
+    return None
+
+# Deadline-bounded routes: section name -> (getter taking an AWSMonitor, default
+# served on timeout or error, shaped like a real result so the frontend can render it)
+def _server_metrics_section(name):
+    return lambda monitor: monitor.get_server_metrics(sections=(name,))[name]
+
+ROUTE_SECTIONS = {
+    'status': {
+        'ec2': (lambda monitor: monitor.get_ec2_status(), []),
+        'rds': (lambda monitor: monitor.get_rds_status(), [])
+    },
+    'metrics_all': {
+        'cpu': (lambda monitor: monitor.get_cpu_utilization(), []),
+        'memory': (lambda monitor: monitor.get_memory_utilization(), []),
+        'network': (lambda monitor: monitor.get_network_metrics(), {'NetworkIn': [], 'NetworkOut': []}),
+        'disk': (
+            lambda monitor: monitor.get_disk_metrics(),
+            {'volumes': [], 'disk_used': [], 'disk_available': [], 'total_size': 0}
+        )
+    },
+    # One section per series group, each fetched in its own GetMetricData call,
+    # so a slow series only delays its own section
+    'server_metrics': {
+        'cpu': (_server_metrics_section('cpu'), {'current': 0, 'history': []}),
+        'memory': (_server_metrics_section('memory'), {'current': 0, 'history': []}),
+        'disk': (_server_metrics_section('disk'), {'current': 0, 'history': []}),
+        'network': (_server_metrics_section('network'), {'in': [], 'out': []})
+    }
+}
+
+def run_route_sections(route, args):
+    """Run a deadline-bounded route's sections and build its response.
+
+    ``args`` supplies ``?deadline_ms=``; raises DeadlineError when it is
+    invalid. The monitor raises on AWS errors, so a failed section is
+    reported as ``error`` and never cached as the last good value.
+    """
+    deadline = Deadline.from_args(args, ROUTE_DEADLINES_MS[route])
+    monitor = AWSMonitor(deadline, raise_errors=True)
+    response, sections, partial = run_sections(section_executor, {
+        name: (lambda getter=getter: getter(monitor), default)
+        for name, (getter, default) in ROUTE_SECTIONS[route].items()
+    }, deadline, section_cache, route)
+    response.update({'partial': partial, 'sections': sections})
+    return response
+
+# Request handling shared by this Flask app and the ASGI app in asgi.py, so
+# both serve identical responses. ``args`` is request.args or query_params.
+STREAM_KEEPALIVE_SECONDS = 15
+
+def log_events_args(args):
+    """Parse /api/logs/events arguments; raises ValueError on bad input."""
+    group_name = args.get('group')
+    if not group_name:
+        raise ValueError('Log group name is required')
+    start_time = args.get('start_time')
+    try:
+        start_time = int(start_time) if start_time else None
+    except ValueError:
+        raise ValueError('start_time must be epoch milliseconds')
+    return group_name, start_time, args.get('filter'), args.get('mode') == 'patterns'
+
+def get_log_events_response(monitor, group_name, start_time, filter_pattern, patterns):
+    if patterns:
+        return monitor.get_log_patterns(group_name, start_time, filter_pattern)
+    return monitor.get_log_events(group_name, start_time, filter_pattern)
+
+def parse_since(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError('since must be an integer inventory version')
+
+def instance_changes(monitor, since):
+    """Response for /api/instances?since=: changes after inventory version ``since``."""
+    monitor.refresh_ec2_inventory()
+    changes = ec2_inventory.changes_since(since)
+    if changes is None:
+        # Change log no longer covers that version, send everything
+        return {'version': ec2_inventory.version, 'full': True, 'instances': ec2_inventory.query()}
+    return {'version': ec2_inventory.version, 'full': False, 'changes': changes}
+
+def instance_filters(args):
+    return {
+        'state': args.get('state'),
+        'instance_type': args.get('type'),
+        'az': args.get('az'),
+        'tags': args.getlist('tag')
+    }
+
+def apm_metrics(cloud_metrics, network_metrics):
+    return {
+        'response_time': cloud_metrics.get('compute', {}),
+        'error_rate': 0,  # Add your error rate calculation
+        'throughput': network_metrics.get('NetworkIn', []),
+        'timestamp': datetime.utcnow().isoformat()
+    }
+
+def rum_metrics():
+    return {
+        'page_load_time': [],  # Add your page load time metrics
+        'user_interactions': [],  # Add user interaction metrics
+        'client_errors': [],  # Add client-side error metrics
+        'timestamp': datetime.utcnow().isoformat()
+    }
+
+def build_export(monitor, args):
+    """Validate /api/export arguments and return ``(body, mimetype, filename)``.
+
+    ``body`` is a blocking generator of encoded chunks. Raises ExportError
+    for invalid arguments, including the cursor, before anything is sent.
+    """
+    kind = args.get('kind', 'metrics')
+    export_format = args.get('format', 'csv')
+    try:
+        start = int(args['start'])
+        end = int(args['end'])
+    except (KeyError, ValueError):
+        raise ExportError('start and end (epoch milliseconds) are required')
+    try:
+        chunk_rows = min(int(args.get('chunk_rows', DEFAULT_CHUNK_ROWS)), MAX_CHUNK_ROWS)
+        period = int(args.get('period', 300))
+    except ValueError:
+        raise ExportError('chunk_rows and period must be integers')
+    if chunk_rows <= 0 or period <= 0:
+        raise ExportError('chunk_rows and period must be positive')
+    if export_format not in ('csv', 'parquet'):
+        raise ExportError('format must be csv or parquet')
+    if export_format == 'parquet' and not PARQUET_AVAILABLE:
+        raise ExportError('Parquet export requires pyarrow')
+
+    cursor = args.get('cursor')
+    if kind == 'metrics':
+        series = [parse_series(value) for value in args.getlist('series')]
+        if not series:
+            raise ExportError('At least one series is required')
+        chunks = iter_metric_chunks(
+            monitor.cloudwatch, series, start, end, period=period, chunk_rows=chunk_rows, cursor=cursor
+        )
+    elif kind == 'logs':
+        group_name = args.get('group')
+        if not group_name:
+            raise ExportError('Log group name is required')
+        chunks = iter_log_chunks(
+            monitor.logs, group_name, start, end,
+            filter_pattern=args.get('filter'), chunk_rows=chunk_rows, cursor=cursor
+        )
+    else:
+        raise ExportError('kind must be metrics or logs')
+
+    logger.info(f"Streaming {kind} export as {export_format}")
+    filename = f"{kind}-export.{export_format}"
+    if export_format == 'parquet':
+        return parquet_stream(chunks), 'application/vnd.apache.parquet', filename
+    return csv_stream(chunks), 'text/csv', filename
+
+def job_event(job):
+    # One server-sent event carrying a job snapshot
+    return f"data: {json.dumps(job)}\n\n"
+
 @app.route('/')
 def home():
     return jsonify({"message": "AWS Monitor API is running"})
@@ -697,13 +1062,11 @@ def home():
 def get_status():
     try:
         logger.info("Status endpoint accessed")
-        monitor = AWSMonitor()
-        response = {
-            'ec2': monitor.get_ec2_status(),
-            'rds': monitor.get_rds_status()
-        }
+        response = run_route_sections('status', request.args)
         logger.info("Status data retrieved successfully")
         return jsonify(response)
+    except DeadlineError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error in status endpoint: {e}")
         return jsonify({"error": str(e)}), 500
@@ -720,34 +1083,20 @@ def get_log_groups():
 @app.route('/api/logs/events')
 def get_log_events():
     try:
-        group_name = request.args.get('group')
-        start_time = request.args.get('start_time')
-        filter_pattern = request.args.get('filter')
-        
-        if not group_name:
-            return jsonify({'error': 'Log group name is required'}), 400
-            
+        try:
+            group_name, start_time, filter_pattern, patterns = log_events_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         monitor = AWSMonitor()
-        events = monitor.get_log_events(
-            group_name,
-            int(start_time) if start_time else None,
-            filter_pattern
-        )
-        return jsonify(events)
+        return jsonify(get_log_events_response(monitor, group_name, start_time, filter_pattern, patterns))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/website-monitoring')
 def get_website_status():
     try:
-        websites = [
-            'your-website1.com',
-            'your-website2.com'
-            # Add your websites here
-        ]
-        
         monitor = AWSMonitor()
-        results = [monitor.monitor_website(url) for url in websites]
+        results = [monitor.monitor_website(url) for url in MONITORED_WEBSITES]
         return jsonify(results)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -764,14 +1113,16 @@ def get_cpu_metrics():
 @app.route('/api/metrics/all')
 def get_all_metrics():
     try:
-        monitor = AWSMonitor()
-        metrics = {
-            'cpu': monitor.get_cpu_utilization(),
-            'memory': monitor.get_memory_utilization(),
-            'network': monitor.get_network_metrics(),
-            'disk': monitor.get_disk_metrics()
-        }
-        return jsonify(metrics)
+        return jsonify(run_route_sections('metrics_all', request.args))
+    except DeadlineError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/metrics/planner')
+def get_planner_stats():
+    try:
+        return jsonify(metric_planner.stats())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -788,7 +1139,7 @@ def get_cloud_metrics():
 def get_db_metrics():
     try:
         monitor = AWSMonitor()
-        metrics = monitor.get_db_latency_metrics()
+        metrics = monitor.get_db_fleet_metrics()
         return jsonify(metrics)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -802,11 +1153,31 @@ def get_disk_metrics():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/disk-forecast')
+def get_disk_forecast():
+    try:
+        try:
+            options = disk_forecast_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        monitor = AWSMonitor()
+        return jsonify(monitor.get_disk_forecast(**options))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/instances')
 def get_instances():
     try:
+        since = request.args.get('since')
+        if since is not None:
+            try:
+                since = parse_since(since)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify(instance_changes(AWSMonitor(), since))
+
         monitor = AWSMonitor()
-        return jsonify(monitor.get_ec2_status())
+        return jsonify(monitor.get_ec2_status(**instance_filters(request.args)))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -823,12 +1194,11 @@ def get_apm_metrics():
     try:
         # Implement basic APM metrics
         monitor = AWSMonitor()
-        metrics = {
-            'response_time': monitor.get_cloud_metrics().get('compute', {}),
-            'error_rate': 0,  # Add your error rate calculation
-            'throughput': monitor.get_network_metrics().get('NetworkIn', []),
-            'timestamp': datetime.utcnow().isoformat()
-        }
+        # Issued together so the planner merges both into one tick
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            cloud_metrics = executor.submit(monitor.get_cloud_metrics)
+            network_metrics = executor.submit(monitor.get_network_metrics)
+            metrics = apm_metrics(cloud_metrics.result(), network_metrics.result())
         return jsonify(metrics)
     except Exception as e:
         logger.error(f"APM Metrics Error: {e}")
@@ -837,14 +1207,7 @@ def get_apm_metrics():
 @app.route('/api/rum-metrics')
 def get_rum_metrics():
     try:
-        # Implement basic RUM metrics
-        metrics = {
-            'page_load_time': [],  # Add your page load time metrics
-            'user_interactions': [],  # Add user interaction metrics
-            'client_errors': [],  # Add client-side error metrics
-            'timestamp': datetime.utcnow().isoformat()
-        }
-        return jsonify(metrics)
+        return jsonify(rum_metrics())
     except Exception as e:
         logger.error(f"RUM Metrics Error: {e}")
         return jsonify({'error': str(e)}), 500
@@ -891,12 +1254,71 @@ def webpage_speed_test():
         logger.error(f"Error in webpage speed test endpoint: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/export')
+def export_history():
+    try:
+        body, mimetype, filename = build_export(AWSMonitor(), request.args)
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Export Error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/actions', methods=['POST'])
+def create_action_job():
+    try:
+        auth_error = actions_auth_error(request.headers)
+        if auth_error:
+            return jsonify({'error': auth_error[0]}), auth_error[1]
+        data = request.get_json() or {}
+        monitor = AWSMonitor()
+        job = action_jobs.submit(monitor.ec2, monitor.rds, data.get('action'), data.get('resources'))
+        return jsonify(job), 202
+    except ActionError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error creating action job: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/actions/<job_id>')
+def get_action_job(job_id):
+    job = action_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/actions/<job_id>/stream')
+def stream_action_job(job_id):
+    if action_jobs.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def events():
+        version = -1
+        while True:
+            job = action_jobs.wait_for_change(job_id, version, timeout=STREAM_KEEPALIVE_SECONDS)
+            if job is None:
+                return
+            if job['version'] == version:
+                yield ": keep-alive\n\n"
+                continue
+            version = job['version']
+            yield job_event(job)
+            if job['status'] in FINISHED_STATUSES:
+                return
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream')
+
 @app.route('/api/server-metrics')
 def get_server_metrics():
     try:
-        monitor = AWSMonitor()
-        metrics = monitor.get_server_metrics()
-        return jsonify(metrics)
+        return jsonify(run_route_sections('server_metrics', request.args))
+    except DeadlineError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -918,5 +1340,11 @@ if __name__ == '__main__':
         logger.error(f"Missing required environment variables: {missing_vars}")
         exit(1)
     
+    # The reloader runs __main__ in both the file watcher and the serving
+    # child; only the child serves requests, so only it runs the background jobs
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        metric_catalog.start(boto3.client('cloudwatch'))
+        if get_access_log_pipeline(boto3.client('s3')) is not None:
+            access_log_pipeline.start()
     logger.info("Starting AWS Monitor API on port 5001")
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
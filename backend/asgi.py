@@ -0,0 +1,363 @@
+"""Async serving mode for the AWS Monitor API.
+
+Exposes the same /api/* routes as the Flask app in app.py with non-blocking
+handlers; request parsing and response building are shared with app.py.
+Every blocking boto3 call runs on a bounded worker pool (AWS_WORKERS
+threads), and concurrent requests for the same data share one in-flight
+call, so many dashboards polling the same endpoint cost one AWS call per
+refresh instead of one worker each. Requests that cannot share a call
+(e.g. different filters) still need a worker each, so raise AWS_WORKERS for
+many distinct pollers. Long-lived streams (exports, action job
+progress) are served from the event loop without pinning a thread.
+
+Run with ``python asgi.py`` or ``uvicorn asgi:app --port 5001``.
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+
+import anyio
+import boto3
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from actions import FINISHED_STATUSES, ActionError
+from app import (
+    AWSMonitor, MONITORED_WEBSITES, STREAM_KEEPALIVE_SECONDS, action_jobs, actions_auth_error,
+    apm_metrics, build_export, disk_forecast_args, get_access_log_pipeline, get_log_events_response,
+    instance_changes, instance_filters, job_event, log_events_args, metric_catalog, metric_planner,
+    parse_since, rum_metrics, run_route_sections
+)
+from deadline import DeadlineError
+from export import ExportError
+
+logger = logging.getLogger(__name__)
+
+AWS_WORKERS = int(os.getenv('AWS_WORKERS', 64))
+STREAM_POLL_SECONDS = (0.1, 5.0)  # allowed ?poll_interval= range for job streams
+aws_limiter = None
+_in_flight = {}
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking (boto3) callable on the bounded AWS worker pool."""
+    return await anyio.to_thread.run_sync(functools.partial(fn, *args, **kwargs), limiter=aws_limiter)
+
+
+def _forget(key, task):
+    _in_flight.pop(key, None)
+    if not task.cancelled():
+        task.exception()  # every waiter re-raises it; don't report it as unretrieved
+
+
+async def shared_call(key, fn, *args, **kwargs):
+    """Like ``run_blocking``, but concurrent calls with the same ``key`` share one run."""
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(run_blocking(fn, *args, **kwargs))
+        _in_flight[key] = task
+        task.add_done_callback(functools.partial(_forget, key))
+    # A client disconnecting must not cancel the call for the other waiters
+    return await asyncio.shield(task)
+
+
+async def iterate_blocking(iterator):
+    # Pull each chunk of a blocking generator on the worker pool
+    done = object()
+    while True:
+        chunk = await run_blocking(next, iterator, done)
+        if chunk is done:
+            return
+        yield chunk
+
+
+def error(message, status_code=500):
+    return JSONResponse({'error': message}, status_code=status_code)
+
+
+@asynccontextmanager
+async def lifespan(_):
+    global aws_limiter
+    aws_limiter = anyio.CapacityLimiter(AWS_WORKERS)
+    # AWS_MONITOR_BACKGROUND=0 skips the catalog and access log threads (e.g. for benchmarks)
+    if os.getenv('AWS_MONITOR_BACKGROUND', '1') == '1':
+        metric_catalog.start(boto3.client('cloudwatch'))
+        pipeline = get_access_log_pipeline(boto3.client('s3'))
+        if pipeline is not None:
+            pipeline.start()
+    yield
+
+
+app = FastAPI(title='AWS Monitor API', lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=['http://localhost:3000'],
+    allow_methods=['GET', 'POST', 'OPTIONS'],
+    allow_headers=['Content-Type', 'Authorization']
+)
+
+
+def monitor_call(method, *args, **kwargs):
+    # AWSMonitor builds its clients on construction, so both run on the pool
+    return getattr(AWSMonitor(), method)(*args, **kwargs)
+
+
+async def call_monitor(method, *args, **kwargs):
+    """Run ``AWSMonitor().<method>(...)``, shared with identical in-flight calls."""
+    key = json.dumps(['monitor', method, args, kwargs], sort_keys=True, default=str)
+    return await shared_call(key, monitor_call, method, *args, **kwargs)
+
+
+async def monitor_route(method, *args, **kwargs):
+    try:
+        return await call_monitor(method, *args, **kwargs)
+    except Exception as e:
+        logger.error(f"Error in {method}: {e}")
+        return error(str(e))
+
+
+async def sections_route(route, request):
+    try:
+        key = json.dumps(['sections', route, request.query_params.get('deadline_ms')])
+        return await shared_call(key, run_route_sections, route, request.query_params)
+    except DeadlineError as e:
+        return error(str(e), 400)
+    except Exception as e:
+        logger.error(f"Error in {route} endpoint: {e}")
+        return error(str(e))
+
+
+@app.get('/')
+async def home():
+    return {"message": "AWS Monitor API is running"}
+
+
+@app.get('/api/status')
+async def get_status(request: Request):
+    return await sections_route('status', request)
+
+
+@app.get('/api/logs/groups')
+async def get_log_groups():
+    return await monitor_route('get_log_groups')
+
+
+@app.get('/api/logs/events')
+async def get_log_events(request: Request):
+    try:
+        args = log_events_args(request.query_params)
+    except ValueError as e:
+        return error(str(e), 400)
+    try:
+        key = json.dumps(['log_events', args])
+        return await shared_call(key, lambda: get_log_events_response(AWSMonitor(), *args))
+    except Exception as e:
+        return error(str(e))
+
+
+@app.get('/api/website-monitoring')
+async def get_website_status():
+    try:
+        return list(await asyncio.gather(*(call_monitor('monitor_website', url) for url in MONITORED_WEBSITES)))
+    except Exception as e:
+        return error(str(e))
+
+
+@app.get('/api/cpu-utilization')
+async def get_cpu_metrics():
+    return await monitor_route('get_cpu_utilization')
+
+
+@app.get('/api/metrics/all')
+async def get_all_metrics(request: Request):
+    return await sections_route('metrics_all', request)
+
+
+@app.get('/api/metrics/planner')
+async def get_planner_stats():
+    return metric_planner.stats()
+
+
+@app.get('/api/cloud-metrics')
+async def get_cloud_metrics():
+    return await monitor_route('get_cloud_metrics')
+
+
+@app.get('/api/db-metrics')
+async def get_db_metrics():
+    return await monitor_route('get_db_fleet_metrics')
+
+
+@app.get('/api/disk-metrics')
+async def get_disk_metrics():
+    return await monitor_route('get_disk_metrics')
+
+
+@app.get('/api/disk-forecast')
+async def get_disk_forecast(request: Request):
+    try:
+        options = disk_forecast_args(request.query_params)
+    except ValueError as e:
+        return error(str(e), 400)
+    return await monitor_route('get_disk_forecast', **options)
+
+
+@app.get('/api/instances')
+async def get_instances(request: Request):
+    try:
+        since = request.query_params.get('since')
+        if since is not None:
+            try:
+                since = parse_since(since)
+            except ValueError as e:
+                return error(str(e), 400)
+            return await shared_call(
+                json.dumps(['instance_changes', since]), lambda: instance_changes(AWSMonitor(), since)
+            )
+        return await call_monitor('get_ec2_status', **instance_filters(request.query_params))
+    except Exception as e:
+        return error(str(e))
+
+
+@app.get('/api/rds-instances')
+async def get_rds_instances():
+    return await monitor_route('get_rds_status')
+
+
+@app.get('/api/apm-metrics')
+async def get_apm_metrics():
+    try:
+        # Issued together so the planner merges both into one tick
+        cloud_metrics, network_metrics = await asyncio.gather(
+            call_monitor('get_cloud_metrics'), call_monitor('get_network_metrics')
+        )
+        return apm_metrics(cloud_metrics, network_metrics)
+    except Exception as e:
+        logger.error(f"APM Metrics Error: {e}")
+        return error(str(e))
+
+
+@app.get('/api/rum-metrics')
+async def get_rum_metrics():
+    return rum_metrics()
+
+
+@app.get('/api/network-metrics')
+async def get_network_metrics():
+    return await monitor_route('get_network_metrics')
+
+
+@app.get('/api/website-performance')
+async def get_website_performance_endpoint():
+    return await monitor_route('get_website_performance')
+
+
+@app.post('/api/webpage-speed-test')
+async def webpage_speed_test(request: Request):
+    try:
+        data = await request.json()
+        url = data.get('url')
+        if not url:
+            return error('URL is required', 400)
+        result = await run_blocking(monitor_call, 'test_webpage_speed', url)
+        if 'error' in result:
+            return JSONResponse(result, status_code=400)
+        return result
+    except Exception as e:
+        logger.error(f"Error in webpage speed test endpoint: {e}")
+        return error(str(e))
+
+
+@app.get('/api/export')
+async def export_history(request: Request):
+    try:
+        body, media_type, filename = await run_blocking(lambda: build_export(AWSMonitor(), request.query_params))
+        return StreamingResponse(
+            iterate_blocking(body),
+            media_type=media_type,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+    except ExportError as e:
+        return error(str(e), 400)
+    except Exception as e:
+        logger.error(f"Export Error: {e}")
+        return error(str(e))
+
+
+@app.post('/api/actions', status_code=202)
+async def create_action_job(request: Request):
+    try:
+        auth_error = actions_auth_error(request.headers)
+        if auth_error:
+            return error(*auth_error)
+        data = await request.json() or {}
+        monitor = await run_blocking(AWSMonitor)
+        return action_jobs.submit(monitor.ec2, monitor.rds, data.get('action'), data.get('resources'))
+    except ActionError as e:
+        return error(str(e), 400)
+    except Exception as e:
+        logger.error(f"Error creating action job: {e}")
+        return error(str(e))
+
+
+@app.get('/api/actions/{job_id}')
+async def get_action_job(job_id: str):
+    job = action_jobs.get(job_id)
+    if job is None:
+        return error('Job not found', 404)
+    return job
+
+
+@app.get('/api/actions/{job_id}/stream')
+async def stream_action_job(job_id: str, poll_interval: float = 0.5):
+    if action_jobs.get(job_id) is None:
+        return error('Job not found', 404)
+    poll_interval = min(max(poll_interval, STREAM_POLL_SECONDS[0]), STREAM_POLL_SECONDS[1])
+
+    async def events():
+        # Polls the job from the event loop, so an open stream holds no worker thread
+        version = -1
+        idle = 0.0
+        while True:
+            job = action_jobs.get(job_id)
+            if job is None:
+                return
+            if job['version'] != version:
+                version, idle = job['version'], 0.0
+                yield job_event(job)
+                if job['status'] in FINISHED_STATUSES:
+                    return
+            elif idle >= STREAM_KEEPALIVE_SECONDS:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(poll_interval)
+            idle += poll_interval
+
+    return StreamingResponse(events(), media_type='text/event-stream')
+
+
+@app.get('/api/server-metrics')
+async def get_server_metrics(request: Request):
+    return await sections_route('server_metrics', request)
+
+
+@app.get('/api/response-time-metrics')
+async def get_response_time_metrics():
+    return await monitor_route('get_response_time_metrics')
+
+
+if __name__ == '__main__':
+    required_env_vars = ['AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_DEFAULT_REGION']
+    missing_vars = [var for var in required_env_vars if not os.getenv(var)]
+
+    if missing_vars:
+        logger.error(f"Missing required environment variables: {missing_vars}")
+        exit(1)
+
+    logger.info(f"Starting async AWS Monitor API on port 5001 with {AWS_WORKERS} AWS workers")
+    uvicorn.run(app, host='0.0.0.0', port=5001)
@@ -0,0 +1,65 @@
+"""Throughput benchmark for the log template miner.
+
+Run from the backend directory:
+
+    python benchmarks/bench_log_patterns.py --lines 500000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_patterns import LogTemplateMiner  # noqa: E402
+
+TEMPLATES = [
+    'GET /api/orders/{id} 200 {ms}ms user={user}',
+    'POST /api/payments 201 {ms}ms user={user} amount={amount}',
+    'Connection from 10.0.{a}.{b} closed after {ms} ms',
+    'Worker {a} picked job {id} from queue default',
+    'ERROR Timeout while calling inventory service after {ms} ms (attempt {a})',
+    'Cache miss for key session:{id}',
+    'Healthcheck OK',
+    'User {user} logged in from 192.168.{a}.{b}',
+]
+
+
+def generate(count, seed=42):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield rng.choice(TEMPLATES).format(
+            id=rng.randint(1, 10 ** 6),
+            ms=rng.randint(1, 5000),
+            user=f"u{rng.randint(1, 5000)}",
+            amount=f"{rng.uniform(1, 500):.2f}",
+            a=rng.randint(0, 255),
+            b=rng.randint(0, 255)
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=500000)
+    parser.add_argument('--target', type=int, default=50000, help='required lines per second')
+    args = parser.parse_args()
+
+    lines = list(generate(args.lines))
+    miner = LogTemplateMiner()
+    started = time.perf_counter()
+    for timestamp, line in enumerate(lines):
+        miner.add(line, timestamp)
+    elapsed = time.perf_counter() - started
+
+    rate = len(lines) / elapsed
+    print(f"{len(lines)} lines in {elapsed:.2f}s: {rate:,.0f} lines/s, {len(miner.templates())} templates")
+    for template in miner.templates(limit=10):
+        print(f"  {template['count']:>8}  {template['template']}")
+    if rate < args.target:
+        print(f"Below target of {args.target:,} lines/s")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Concurrent dashboard clients: Flask dev server vs. the async ASGI app.
+
+Each server runs in its own process with AWSMonitor replaced by a fake whose
+calls sleep for ``--aws-delay`` seconds, simulating a slow AWS backend.
+
+``--mode poll`` has N clients poll in a loop for ``--duration`` seconds,
+once per ``--workload``. ``shared`` has every client poll /api/rds-instances
+with the same arguments, so the ASGI app serves concurrent polls from one
+shared in-flight AWS call. ``distinct`` gives each client its own
+/api/instances?type= filter, so no call can be shared and every request
+holds a worker for the full AWS delay. Flask makes one call per request in
+both. ``--mode stream`` has N clients each hold an open
+/api/actions/<id>/stream connection to a job that never finishes, like
+dashboards watching a long action. The report lists completed requests (or
+streams held to the end), latency percentiles, errors, and the peak thread
+count and RSS of the server process.
+
+Run from the backend directory:
+
+    python benchmarks/bench_serving.py --mode poll --clients 50 200 1000 --workload shared distinct
+    python benchmarks/bench_serving.py --mode stream --clients 100 1000 2000
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Poll path per workload, formatted with the client's index
+POLL_PATHS = {
+    'shared': '/api/rds-instances',
+    'distinct': '/api/instances?type=bench-{client}'
+}
+STREAM_JOB_ID = 'bench'
+STREAM_PATH = f'/api/actions/{STREAM_JOB_ID}/stream'
+
+
+def serve(server, port, aws_delay, aws_workers):
+    os.environ['AWS_MONITOR_BACKGROUND'] = '0'
+    os.environ['AWS_WORKERS'] = str(aws_workers)
+    import app as flask_app
+
+    class SlowMonitor:
+        def __init__(self, deadline=None):
+            pass
+
+        def get_rds_status(self):
+            time.sleep(aws_delay)
+            return [{'id': 'db-1', 'status': 'available', 'engine': 'postgres', 'size': 'db.t3.micro'}]
+
+        def get_ec2_status(self, state=None, instance_type=None, az=None, tags=None):
+            time.sleep(aws_delay)
+            return [{'id': 'i-bench', 'state': state or 'running', 'type': instance_type, 'az': az}]
+
+    flask_app.AWSMonitor = SlowMonitor
+    # A job that stays running, so every stream client keeps its connection open
+    from actions import ActionJob
+    job = ActionJob('restart', [('i-bench', 'ec2')])
+    job.id, job.status = STREAM_JOB_ID, 'running'
+    flask_app.action_jobs._jobs[job.id] = job
+    if server == 'flask':
+        # Same settings as app.py's __main__, minus the reloader
+        flask_app.app.run(host='127.0.0.1', port=port, threaded=True, use_reloader=False)
+    else:
+        import uvicorn
+        from asgi import app
+        uvicorn.run(app, host='127.0.0.1', port=port, log_level='warning', backlog=4096)
+
+
+async def fetch(port, timeout, path=POLL_PATHS['shared']):
+    started = time.perf_counter()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    if not response.startswith(b'HTTP/1.1 200'):
+        raise RuntimeError(response.split(b'\r\n', 1)[0].decode(errors='replace'))
+    return time.perf_counter() - started
+
+
+async def hold_stream(port, stop_at, timeout, latencies, errors, client=0, workload=None):
+    # Latency is the time to the first event; the stream counts once held until stop_at
+    started = time.perf_counter()
+    first_event = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+    except Exception as e:
+        errors.append(type(e).__name__)
+        return
+    try:
+        writer.write(f"GET {STREAM_PATH} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        head = await asyncio.wait_for(reader.readuntil(b'data: '), timeout)
+        if not head.startswith(b'HTTP/1.1 200'):
+            raise RuntimeError(head.split(b'\r\n', 1)[0].decode(errors='replace'))
+        first_event = time.perf_counter() - started
+        while time.monotonic() < stop_at:
+            if not await asyncio.wait_for(reader.read(4096), max(stop_at - time.monotonic(), 0.01)):
+                raise ConnectionError('stream closed early')
+    except asyncio.TimeoutError:
+        if first_event is None or time.monotonic() < stop_at:
+            errors.append('TimeoutError')
+            return
+    except Exception as e:
+        errors.append(type(e).__name__)
+        return
+    finally:
+        writer.close()
+    latencies.append(first_event)
+
+
+async def poll(port, stop_at, timeout, latencies, errors, client=0, workload='shared'):
+    path = POLL_PATHS[workload].format(client=client)
+    while time.monotonic() < stop_at:
+        try:
+            latencies.append(await fetch(port, timeout, path))
+        except Exception as e:
+            errors.append(type(e).__name__)
+            await asyncio.sleep(0.05)
+
+
+def process_status(pid):
+    # (threads, RSS in MB) from /proc, zeros where unavailable
+    status = {}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                status[key] = value.split()
+    except OSError:
+        pass
+    return int(status.get('Threads', [0])[0]), int(status.get('VmRSS', [0])[0]) / 1024
+
+
+async def run_load(mode, port, pid, clients, duration, timeout, workload):
+    latencies, errors = [], []
+    stop_at = time.monotonic() + duration
+    client = poll if mode == 'poll' else hold_stream
+    tasks = [
+        asyncio.create_task(client(port, stop_at, timeout, latencies, errors, index, workload))
+        for index in range(clients)
+    ]
+    peak_threads = peak_rss = 0
+    while not all(task.done() for task in tasks):
+        threads, rss = process_status(pid)
+        peak_threads, peak_rss = max(peak_threads, threads), max(peak_rss, rss)
+        await asyncio.sleep(0.2)
+    return latencies, errors, peak_threads, peak_rss
+
+
+def wait_until_up(port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            asyncio.run(fetch(port, 5))
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def percentile(values, q):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mode', choices=['poll', 'stream'], default='poll')
+    parser.add_argument('--clients', type=int, nargs='+', default=[50, 200, 1000])
+    parser.add_argument('--workload', nargs='+', default=['shared', 'distinct'], choices=list(POLL_PATHS))
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--aws-delay', type=float, default=0.5)
+    parser.add_argument('--aws-workers', type=int, default=64)
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--port', type=int, default=5101)
+    parser.add_argument('--servers', nargs='+', default=['flask', 'asgi'], choices=['flask', 'asgi'])
+    parser.add_argument('--serve', choices=['flask', 'asgi'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.aws_delay, args.aws_workers)
+        return
+
+    print(f"{args.mode}: AWS delay {args.aws_delay}s, {args.duration}s per run, ASGI workers {args.aws_workers}")
+    workloads = args.workload if args.mode == 'poll' else ['-']
+    print(
+        f"{'server':<7}{'workload':>9}{'clients':>8}{'ok':>8}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}"
+        f"{'errors':>8}{'threads':>9}{'RSS MB':>8}"
+    )
+    for server in args.servers:
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--serve', server, '--port', str(args.port),
+             '--aws-delay', str(args.aws_delay), '--aws-workers', str(args.aws_workers)],
+            cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_until_up(args.port)
+            for workload in workloads:
+                for clients in args.clients:
+                    latencies, errors, peak_threads, peak_rss = asyncio.run(
+                        run_load(args.mode, args.port, process.pid, clients, args.duration, args.timeout, workload)
+                    )
+                    print(
+                        f"{server:<7}{workload:>9}{clients:>8}{len(latencies):>8}{len(latencies) / args.duration:>9.1f}"
+                        f"{percentile(latencies, 0.5) * 1000:>9.0f}{percentile(latencies, 0.99) * 1000:>9.0f}"
+                        f"{len(errors):>8}{peak_threads:>9}{peak_rss:>8.0f}"
+                    )
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# GetMetricData accepts at most 500 queries per request
+MAX_QUERIES_PER_CALL = 500
+
+
+def metric_query(query_id, namespace, metric_name, dimensions, period=300, stat='Average'):
+    return {
+        'Id': query_id,
+        'MetricStat': {
+            'Metric': {
+                'Namespace': namespace,
+                'MetricName': metric_name,
+                'Dimensions': [{'Name': name, 'Value': value} for name, value in dimensions]
+            },
+            'Period': period,
+            'Stat': stat
+        },
+        'ReturnData': True
+    }
+
+
+def fetch_metric_data(cloudwatch, queries, start_time, end_time):
+    """Run ``queries`` through as few GetMetricData calls as possible.
+
+    Queries are packed into chunks of MAX_QUERIES_PER_CALL and each chunk
+    follows NextToken until exhausted. Returns ``(results, calls)`` where
+    ``results`` maps query id to a list of ``(timestamp, value)`` tuples in
+    ascending time order and ``calls`` is the number of upstream requests.
+    """
+    results = {query['Id']: [] for query in queries}
+    calls = 0
+
+    for offset in range(0, len(queries), MAX_QUERIES_PER_CALL):
+        chunk = queries[offset:offset + MAX_QUERIES_PER_CALL]
+        kwargs = {
+            'MetricDataQueries': chunk,
+            'StartTime': start_time,
+            'EndTime': end_time,
+            'ScanBy': 'TimestampAscending'
+        }
+        while True:
+            response = cloudwatch.get_metric_data(**kwargs)
+            calls += 1
+            for result in response['MetricDataResults']:
+                results[result['Id']].extend(zip(result['Timestamps'], result['Values']))
+            next_token = response.get('NextToken')
+            if not next_token:
+                break
+            kwargs['NextToken'] = next_token
+
+    for series in results.values():
+        series.sort(key=lambda point: point[0])
+
+    logger.info(f"Fetched {len(queries)} metric queries in {calls} GetMetricData calls")
+    return results, calls
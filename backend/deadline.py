@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+from concurrent.futures import wait
+
+logger = logging.getLogger(__name__)
+
+MIN_DEADLINE_MS = 100
+MAX_DEADLINE_MS = 60000
+
+
+class DeadlineError(ValueError):
+    pass
+
+
+class Deadline:
+    """Latency budget for one request, measured on the monotonic clock."""
+
+    def __init__(self, budget_ms):
+        self.budget_ms = budget_ms
+        self.expires_at = time.monotonic() + budget_ms / 1000.0
+
+    @classmethod
+    def from_args(cls, args, default_ms):
+        # ?deadline_ms= overrides the route default, clamped to a sane range
+        try:
+            budget_ms = int(args.get('deadline_ms', default_ms))
+        except (TypeError, ValueError):
+            raise DeadlineError('deadline_ms must be an integer number of milliseconds')
+        return cls(min(max(budget_ms, MIN_DEADLINE_MS), MAX_DEADLINE_MS))
+
+    def remaining(self):
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self):
+        return self.remaining() <= 0
+
+
+class SectionCache:
+    """Last good result per route section, kept for ``ttl`` seconds."""
+
+    def __init__(self, ttl=120):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+
+def run_sections(executor, sections, deadline, cache, route):
+    """Run independent response sections concurrently under ``deadline``.
+
+    ``sections`` maps a section name to ``(callable, default)``. Callables
+    must raise on failure: sections that finish in time are returned with
+    status ``ok`` and cached, failed ones get ``default`` with status
+    ``error`` and never touch the cache. The rest keep
+    running on the executor and store their result in ``cache`` when they
+    complete; the response gets the last cached value (status ``stale``)
+    or the default (status ``timeout``) instead.
+
+    Returns ``(results, statuses, partial)``.
+    """
+    futures = {name: executor.submit(fn) for name, (fn, _) in sections.items()}
+    wait(futures.values(), timeout=deadline.remaining())
+
+    results, statuses = {}, {}
+    for name, future in futures.items():
+        key = (route, name)
+        default = sections[name][1]
+        if future.done():
+            try:
+                results[name] = future.result()
+                statuses[name] = 'ok'
+                cache.set(key, results[name])
+            except Exception as e:
+                logger.error(f"Section {route}.{name} failed: {e}")
+                results[name] = default
+                statuses[name] = 'error'
+            continue
+
+        def store(done, key=key):
+            if done.exception() is None:
+                cache.set(key, done.result())
+
+        future.add_done_callback(store)
+        cached = cache.get(key)
+        if cached is not None:
+            results[name], statuses[name] = cached, 'stale'
+        else:
+            results[name], statuses[name] = default, 'timeout'
+
+    partial = any(status != 'ok' for status in statuses.values())
+    if partial:
+        logger.info(f"{route} returned partial results after {deadline.budget_ms}ms: {statuses}")
+    return results, statuses, partial
@@ -0,0 +1,109 @@
+import warnings
+
+import numpy as np
+
+SECONDS_PER_DAY = 86400.0
+HUBER_K = 1.345
+Z_95 = 1.96
+
+
+def _weighted_linear_fit(t, y, weights):
+    # Row-wise weighted least squares: y ~ intercept + slope * t
+    w_sum = weights.sum(axis=1)
+    safe_sum = np.where(w_sum > 0, w_sum, 1.0)
+    t_mean = (weights * t).sum(axis=1) / safe_sum
+    y_mean = (weights * y).sum(axis=1) / safe_sum
+    dt = t - t_mean[:, None]
+    dy = y - y_mean[:, None]
+    sxx = (weights * dt * dt).sum(axis=1)
+    slope = np.where(sxx > 0, (weights * dt * dy).sum(axis=1) / np.where(sxx > 0, sxx, 1.0), 0.0)
+    intercept = y_mean - slope * t_mean
+    return slope, intercept, sxx
+
+
+def fit_trends(timestamps, usage, iterations=5, season_seconds=SECONDS_PER_DAY):
+    """Fit a robust linear trend to every row of ``usage`` at once.
+
+    ``timestamps`` is a 1-D array of epoch seconds shared by all rows and
+    ``usage`` a (volumes x timestamps) array of used percentages with NaN
+    for missing points. Outliers are down-weighted with Huber IRLS. When the
+    history spans at least two seasons, a per-volume hour-of-season profile
+    is removed before the final fit.
+
+    Returns a dict of 1-D arrays: ``slope`` (percent per second), ``level``
+    (fitted value at the last timestamp), ``slope_se`` and ``points``.
+    """
+    usage = np.asarray(usage, dtype=float)
+    t = np.broadcast_to(np.asarray(timestamps, dtype=float) - timestamps[-1], usage.shape)
+    observed = ~np.isnan(usage)
+    y = np.where(observed, usage, 0.0)
+    base_weights = observed.astype(float)
+
+    def robust_fit(values):
+        weights = base_weights
+        for _ in range(iterations):
+            slope, intercept, sxx = _weighted_linear_fit(t, values, weights)
+            residuals = np.where(observed, values - (intercept[:, None] + slope[:, None] * t), 0.0)
+            # MAD scale estimate, ignoring missing points
+            abs_res = np.where(observed, np.abs(residuals), np.nan)
+            with np.errstate(all='ignore'), warnings.catch_warnings():
+                # Rows without observations yield All-NaN slices; their scale is replaced below
+                warnings.simplefilter('ignore', RuntimeWarning)
+                scale = np.nanmedian(abs_res, axis=1) / 0.6745
+            scale = np.where(np.isfinite(scale) & (scale > 1e-9), scale, 1e-9)
+            u = np.abs(residuals) / (HUBER_K * scale[:, None])
+            weights = base_weights * np.where(u <= 1, 1.0, 1.0 / np.maximum(u, 1e-12))
+        return slope, intercept, sxx, residuals, weights
+
+    slope, intercept, sxx, residuals, weights = robust_fit(y)
+
+    span = timestamps[-1] - timestamps[0] if len(timestamps) else 0
+    if season_seconds and span >= 2 * season_seconds:
+        step = np.median(np.diff(timestamps))
+        slots = max(int(round(season_seconds / step)), 1)
+        phase = (np.round(np.asarray(timestamps, dtype=float) / step).astype(int)) % slots
+        # Median residual per (volume, phase slot) gives the seasonal profile
+        profile = np.zeros((usage.shape[0], slots))
+        masked = np.where(observed, residuals, np.nan)
+        with np.errstate(all='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            for slot in range(slots):
+                columns = phase == slot
+                if columns.any():
+                    profile[:, slot] = np.nan_to_num(np.nanmedian(masked[:, columns], axis=1))
+        seasonal = profile[:, phase]
+        slope, intercept, sxx, residuals, weights = robust_fit(y - seasonal)
+
+    points = observed.sum(axis=1)
+    dof = np.maximum(points - 2, 1)
+    sigma2 = (weights * residuals * residuals).sum(axis=1) / dof
+    slope_se = np.sqrt(np.where(sxx > 0, sigma2 / np.where(sxx > 0, sxx, 1.0), np.inf))
+    return {
+        'slope': slope,
+        'level': intercept,
+        'slope_se': slope_se,
+        'points': points
+    }
+
+
+def time_to_full(fit, capacity=100.0, min_points=3):
+    """Estimate days until each volume reaches ``capacity`` percent.
+
+    Returns ``(days, days_low, days_high, confidence)`` arrays. Volumes that
+    are not growing, or lack ``min_points`` observations, get ``inf``.
+    ``confidence`` falls from 1 towards 0 as the 95% interval of the growth
+    rate widens relative to the rate itself.
+    """
+    slope = fit['slope'] * SECONDS_PER_DAY
+    slope_se = fit['slope_se'] * SECONDS_PER_DAY
+    headroom = np.maximum(capacity - fit['level'], 0.0)
+    valid = fit['points'] >= min_points
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days = np.where(valid & (slope > 0), headroom / slope, np.inf)
+        fast = slope + Z_95 * slope_se
+        slow = slope - Z_95 * slope_se
+        days_low = np.where(valid & (fast > 0), headroom / fast, np.inf)
+        days_high = np.where(valid & (slow > 0), headroom / slow, np.inf)
+        confidence = np.where(valid & (slope > 0), np.clip(1.0 - Z_95 * slope_se / slope, 0.0, 1.0), 0.0)
+    return days, days_low, days_high, confidence
@@ -0,0 +1,238 @@
+import base64
+import io
+import json
+import logging
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from cloudwatch_batch import fetch_metric_data, metric_query
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is unavailable without pyarrow
+    pa = None
+    pq = None
+
+PARQUET_AVAILABLE = pq is not None
+
+DEFAULT_CHUNK_ROWS = 10000
+MAX_CHUNK_ROWS = 10000  # also the filter_log_events page limit
+PARQUET_MAX_CHUNKS = 10  # chunks per Parquet file, see parquet_stream
+
+
+class ExportError(ValueError):
+    pass
+
+
+def encode_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor, key, types):
+    """Decode a cursor and check it holds ``key`` of one of ``types``."""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ExportError('Invalid export cursor')
+    if not isinstance(position, dict) or key not in position or not isinstance(position[key], types):
+        raise ExportError('Invalid export cursor')
+    return position[key]
+
+
+def parse_series(value):
+    """Parse ``Namespace|MetricName|Stat[|Name=Value,Name=Value]`` into a series tuple."""
+    parts = value.split('|')
+    if len(parts) not in (3, 4) or not all(parts[:3]):
+        raise ExportError(f"Invalid series '{value}', expected Namespace|MetricName|Stat[|Name=Value,...]")
+    dimensions = ()
+    if len(parts) == 4 and parts[3]:
+        try:
+            dimensions = tuple(sorted(tuple(pair.split('=', 1)) for pair in parts[3].split(',')))
+        except ValueError:
+            raise ExportError(f"Invalid dimensions in series '{value}'")
+        if any(len(pair) != 2 for pair in dimensions):
+            raise ExportError(f"Invalid dimensions in series '{value}'")
+    return parts[0], parts[1], parts[2], dimensions
+
+
+def _series_label(series):
+    namespace, metric_name, stat, dimensions = series
+    label = f"{namespace}|{metric_name}|{stat}"
+    if dimensions:
+        label += '|' + ','.join(f"{name}={value}" for name, value in dimensions)
+    return label
+
+
+def _metric_frame(rows):
+    frame = pd.DataFrame(rows, columns=['timestamp', 'series', 'value'])
+    frame = frame.astype({'series': 'string', 'value': 'float64'})
+    frame['timestamp'] = pd.to_datetime(frame['timestamp'], utc=True)
+    return frame.sort_values(['timestamp', 'series'], kind='stable')
+
+
+def _log_frame(rows):
+    frame = pd.DataFrame(rows, columns=['timestamp', 'logStreamName', 'message'])
+    frame = frame.astype({'timestamp': 'int64', 'logStreamName': 'string', 'message': 'string'})
+    frame['timestamp'] = pd.to_datetime(frame['timestamp'], unit='ms', utc=True)
+    return frame
+
+
+def iter_metric_chunks(cloudwatch, series, start_ms, end_ms, period=300, chunk_rows=DEFAULT_CHUNK_ROWS, cursor=None):
+    """Return an iterator of ``(DataFrame, cursor, next_cursor)`` chunks of metric history.
+
+    The range is walked in consecutive time windows sized so that one window
+    holds about ``chunk_rows`` datapoints across all series; every window is
+    a single packed GetMetricData request. ``cursor`` re-fetches the chunk
+    itself, ``next_cursor`` the one after it (None after the last chunk).
+    An empty range yields one empty chunk. ``cursor`` is validated before
+    returning, so a bad one raises ExportError here rather than mid-stream.
+    """
+    start = int(start_ms // 1000) // period * period
+    end = int(end_ms // 1000)
+    if cursor:
+        start = decode_cursor(cursor, 't', int)
+
+    window = max(chunk_rows // max(len(series), 1), 1) * period
+    labels = {f"s{index}": _series_label(item) for index, item in enumerate(series)}
+    queries = [
+        metric_query(f"s{index}", namespace, metric_name, dimensions, period=period, stat=stat)
+        for index, (namespace, metric_name, stat, dimensions) in enumerate(series)
+    ]
+
+    def chunks(start):
+        if start >= end:
+            yield _metric_frame([]), encode_cursor({'t': start}), None
+            return
+        while start < end:
+            window_end = min(start + window, end)
+            results, _ = fetch_metric_data(
+                cloudwatch, queries,
+                datetime.fromtimestamp(start, tz=timezone.utc),
+                datetime.fromtimestamp(window_end, tz=timezone.utc)
+            )
+            frame = _metric_frame([
+                (timestamp, labels[query_id], value)
+                for query_id, points in results.items()
+                for timestamp, value in points
+            ])
+            yield frame, encode_cursor({'t': start}), (encode_cursor({'t': window_end}) if window_end < end else None)
+            start = window_end
+
+    return chunks(start)
+
+
+def iter_log_chunks(logs, log_group_name, start_ms, end_ms, filter_pattern=None, chunk_rows=DEFAULT_CHUNK_ROWS, cursor=None):
+    """Return an iterator of ``(DataFrame, cursor, next_cursor)`` chunks of log events.
+
+    Each chunk is one filter_log_events page; the cursors work as in
+    ``iter_metric_chunks`` and ``cursor`` is validated before returning.
+    """
+    kwargs = {
+        'logGroupName': log_group_name,
+        'startTime': int(start_ms),
+        'endTime': int(end_ms),
+        'limit': min(chunk_rows, MAX_CHUNK_ROWS)
+    }
+    if filter_pattern:
+        kwargs['filterPattern'] = filter_pattern
+    token = decode_cursor(cursor, 'token', (str, type(None))) if cursor else None
+
+    def chunks(token):
+        while True:
+            if token:
+                kwargs['nextToken'] = token
+            response = logs.filter_log_events(**kwargs)
+            next_token = response.get('nextToken')
+            frame = _log_frame([
+                (event['timestamp'], event['logStreamName'], event['message']) for event in response['events']
+            ])
+            yield frame, encode_cursor({'token': token}), (encode_cursor({'token': next_token}) if next_token else None)
+            if not next_token:
+                break
+            token = next_token
+
+    return chunks(token)
+
+
+def csv_stream(chunks):
+    """Encode chunks as one CSV document with a ``cursor`` column.
+
+    Each row's cursor re-fetches the chunk it belongs to. To resume an
+    interrupted download, take the cursor of the last complete line, drop
+    the rows carrying it and request again with ``?cursor=`` set to it.
+    """
+    header = True
+    for frame, cursor, _ in chunks:
+        buffer = io.StringIO()
+        frame.assign(cursor=cursor).to_csv(
+            buffer, index=False, header=header, date_format='%Y-%m-%dT%H:%M:%S.%fZ'
+        )
+        header = False
+        yield buffer.getvalue()
+
+
+class _DrainableSink(io.RawIOBase):
+    # File object for ParquetWriter whose written bytes are handed out and released per row group
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def parquet_stream(chunks, max_chunks=PARQUET_MAX_CHUNKS):
+    """Encode up to ``max_chunks`` chunks as one Parquet file, a row group per chunk.
+
+    A Parquet file is unreadable until its footer is written, so an
+    interrupted download cannot be resumed row by row. Instead every file is
+    complete on its own. Rows carry the same ``cursor`` column as the CSV
+    export. When more data remains, the footer's key-value metadata holds
+    ``next_cursor`` for the request that returns the next file. An
+    interrupted file is discarded and requested again with the same cursor.
+    An empty range still produces a valid file with the schema and no rows.
+    """
+    if not PARQUET_AVAILABLE:
+        raise ExportError('Parquet export requires pyarrow')
+
+    sink = _DrainableSink()
+    writer = None
+    next_cursor = None
+    try:
+        for index, (frame, cursor, next_cursor) in enumerate(chunks):
+            table = pa.Table.from_pandas(
+                frame.assign(cursor=cursor).astype({'cursor': 'string'}), preserve_index=False
+            )
+            if writer is None:
+                writer = pq.ParquetWriter(sink, table.schema)
+            writer.write_table(table.cast(writer.schema))
+            data = sink.drain()
+            if data:
+                yield data
+            if index + 1 >= max_chunks:
+                break
+    finally:
+        if writer is not None:
+            if next_cursor:
+                writer.add_key_value_metadata({'next_cursor': next_cursor})
+            writer.close()
+    data = sink.drain()
+    if data:
+        yield data
@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+
+class InstanceInventory:
+    """In-memory EC2 instance table with secondary indexes and a change log.
+
+    Every snapshot applied through ``apply_snapshot`` is diffed against the
+    previous one. When anything changed the inventory version is bumped and
+    the diff is kept so clients can ask for ``changes_since(version)``
+    instead of downloading the whole fleet again.
+    """
+
+    def __init__(self, history_limit=100):
+        self._lock = threading.Lock()
+        self.version = 0
+        self.last_refresh = None
+        self._instances = {}
+        self._by_state = defaultdict(set)
+        self._by_type = defaultdict(set)
+        self._by_az = defaultdict(set)
+        self._by_tag = defaultdict(set)
+        self._by_tag_key = defaultdict(set)
+        self._changes = deque(maxlen=history_limit)
+
+    @staticmethod
+    def normalize(instance):
+        return {
+            'id': instance['InstanceId'],
+            'state': instance['State']['Name'],
+            'type': instance['InstanceType'],
+            'az': instance.get('Placement', {}).get('AvailabilityZone'),
+            'tags': {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])},
+            'launch_time': instance['LaunchTime'].isoformat() if 'LaunchTime' in instance else None
+        }
+
+    def is_stale(self, max_age):
+        return self.last_refresh is None or time.time() - self.last_refresh > max_age
+
+    def _index(self, record):
+        instance_id = record['id']
+        self._by_state[record['state']].add(instance_id)
+        self._by_type[record['type']].add(instance_id)
+        self._by_az[record['az']].add(instance_id)
+        for key, value in record['tags'].items():
+            self._by_tag[(key, value)].add(instance_id)
+            self._by_tag_key[key].add(instance_id)
+
+    def _unindex(self, record):
+        instance_id = record['id']
+        self._by_state[record['state']].discard(instance_id)
+        self._by_type[record['type']].discard(instance_id)
+        self._by_az[record['az']].discard(instance_id)
+        for key, value in record['tags'].items():
+            self._by_tag[(key, value)].discard(instance_id)
+            self._by_tag_key[key].discard(instance_id)
+
+    def apply_snapshot(self, instances):
+        """Replace the table with a full ``describe_instances`` snapshot.
+
+        Only the records that actually differ are re-indexed. Returns the
+        diff as a dict with ``added``, ``removed``, ``modified`` (full
+        records whose state, type, AZ or tags changed) and ``state_changed``.
+        """
+        snapshot = {}
+        for instance in instances:
+            record = self.normalize(instance)
+            snapshot[record['id']] = record
+
+        with self._lock:
+            added, removed, modified, state_changed = [], [], [], []
+
+            for instance_id, record in snapshot.items():
+                previous = self._instances.get(instance_id)
+                if previous is None:
+                    added.append(record)
+                elif previous != record:
+                    if previous['state'] != record['state']:
+                        state_changed.append({
+                            'id': instance_id,
+                            'from': previous['state'],
+                            'to': record['state']
+                        })
+                    self._unindex(previous)
+                    modified.append(record)
+                else:
+                    continue
+                self._instances[instance_id] = record
+                self._index(record)
+
+            for instance_id in list(self._instances):
+                if instance_id not in snapshot:
+                    self._unindex(self._instances.pop(instance_id))
+                    removed.append(instance_id)
+
+            diff = {
+                'added': added,
+                'removed': removed,
+                'modified': modified,
+                'state_changed': state_changed
+            }
+            if added or removed or modified:
+                self.version += 1
+                self._changes.append((self.version, diff))
+            self.last_refresh = time.time()
+            return diff
+
+    def query(self, state=None, instance_type=None, az=None, tags=None):
+        """Return instance records matching every given filter.
+
+        ``tags`` is a list of ``key:value`` strings, or bare ``key`` to match
+        any value. Filters are answered by intersecting the index sets.
+        """
+        with self._lock:
+            candidates = []
+            if state:
+                candidates.append(self._by_state.get(state, set()))
+            if instance_type:
+                candidates.append(self._by_type.get(instance_type, set()))
+            if az:
+                candidates.append(self._by_az.get(az, set()))
+            for tag in tags or []:
+                key, sep, value = tag.partition(':')
+                if sep:
+                    candidates.append(self._by_tag.get((key, value), set()))
+                else:
+                    candidates.append(self._by_tag_key.get(key, set()))
+
+            if candidates:
+                candidates.sort(key=len)
+                ids = set(candidates[0]).intersection(*candidates[1:])
+            else:
+                ids = self._instances.keys()
+            return [dict(self._instances[instance_id]) for instance_id in sorted(ids)]
+
+    def changes_since(self, version):
+        """Return the merged diff since ``version``.
+
+        Returns None when the requested version is older than the retained
+        change log, or newer than the current one (e.g. the client synced
+        before a server restart), in which case the caller needs a full
+        resync.
+        """
+        with self._lock:
+            if version > self.version:
+                return None
+            if version == self.version:
+                return {'added': [], 'removed': [], 'modified': [], 'state_changed': []}
+            if not self._changes or self._changes[0][0] > version + 1:
+                return None
+
+            added, modified, removed, state_changed = {}, {}, set(), []
+            for change_version, diff in self._changes:
+                if change_version <= version:
+                    continue
+                for record in diff['added']:
+                    added[record['id']] = record
+                    removed.discard(record['id'])
+                for record in diff['modified']:
+                    if record['id'] not in added:
+                        modified[record['id']] = record
+                for instance_id in diff['removed']:
+                    modified.pop(instance_id, None)
+                    if added.pop(instance_id, None) is None:
+                        removed.add(instance_id)
+                state_changed.extend(diff['state_changed'])
+
+            # Send the current record for anything added or modified in between
+            for records in (added, modified):
+                for instance_id in list(records):
+                    if instance_id in self._instances:
+                        records[instance_id] = dict(self._instances[instance_id])
+            # Transitions only for instances the client keeps: added ones arrive
+            # with their current state, and removed (or added then removed) ones are gone
+            state_changed = [
+                change for change in state_changed
+                if change['id'] in self._instances and change['id'] not in added
+            ]
+            return {
+                'added': list(added.values()),
+                'removed': sorted(removed),
+                'modified': list(modified.values()),
+                'state_changed': state_changed
+            }
@@ -0,0 +1,131 @@
+import re
+from collections import OrderedDict
+
+WILDCARD = '<*>'
+
+_has_digit = re.compile(r'\d').search
+
+
+class LogCluster:
+    __slots__ = ('cluster_id', 'tokens', 'count', 'first_seen', 'last_seen', 'samples', 'leaf')
+
+    def __init__(self, cluster_id, tokens, timestamp, leaf):
+        self.cluster_id = cluster_id
+        self.tokens = tokens
+        self.count = 0
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.samples = []
+        self.leaf = leaf
+
+    @property
+    def template(self):
+        return ' '.join(self.tokens)
+
+    def to_dict(self):
+        return {
+            'id': self.cluster_id,
+            'template': self.template,
+            'count': self.count,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'sample_params': self.samples
+        }
+
+
+class LogTemplateMiner:
+    """Incremental Drain-style log template miner.
+
+    Messages are routed through a fixed-depth parse tree (token count, then
+    the first ``depth - 2`` tokens) to a small leaf of candidate clusters
+    and merged into the most similar one, with differing tokens replaced by
+    ``<*>``. Tokens containing digits are routed as wildcards. At most
+    ``max_clusters`` templates are kept; the least recently matched one is
+    evicted when a new template would exceed the limit, so memory stays
+    bounded however many lines are fed in.
+    """
+
+    def __init__(self, depth=4, similarity=0.4, max_children=100, max_clusters=1000, max_samples=3):
+        self.depth = max(depth - 2, 1)
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.max_samples = max_samples
+        self.lines = 0
+        self._root = {}
+        self._clusters = OrderedDict()
+        self._next_id = 1
+
+    def _leaf(self, tokens):
+        node = self._root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth]:
+            if _has_digit(token):
+                token = WILDCARD
+            child = node.get(token)
+            if child is None:
+                if len(node) < self.max_children:
+                    child = node[token] = {}
+                else:
+                    child = node.setdefault(WILDCARD, {})
+            node = child
+        return node.setdefault(None, [])
+
+    def _best_match(self, leaf, tokens):
+        best, best_score, best_params = None, -1.0, -1
+        for cluster in leaf:
+            matched = params = 0
+            for template_token, token in zip(cluster.tokens, tokens):
+                if template_token == WILDCARD:
+                    params += 1
+                elif template_token == token:
+                    matched += 1
+            score = matched / len(tokens)
+            if score > best_score or (score == best_score and params > best_params):
+                best, best_score, best_params = cluster, score, params
+        if best is not None and best_score >= self.similarity:
+            return best
+        return None
+
+    def add(self, message, timestamp=None):
+        """Assign ``message`` to a template and return its LogCluster."""
+        self.lines += 1
+        tokens = message.split() or ['']
+        leaf = self._leaf(tokens)
+        cluster = self._best_match(leaf, tokens)
+
+        if cluster is None:
+            if len(self._clusters) >= self.max_clusters:
+                _, evicted = self._clusters.popitem(last=False)
+                evicted.leaf.remove(evicted)
+            cluster = LogCluster(self._next_id, tokens, timestamp, leaf)
+            self._next_id += 1
+            self._clusters[cluster.cluster_id] = cluster
+            leaf.append(cluster)
+        else:
+            template = cluster.tokens
+            if template != tokens:
+                merged = [
+                    template_token if template_token == token else WILDCARD
+                    for template_token, token in zip(template, tokens)
+                ]
+                if merged != template:
+                    cluster.tokens = merged
+            self._clusters.move_to_end(cluster.cluster_id)
+
+        cluster.count += 1
+        if timestamp is not None:
+            if cluster.first_seen is None or timestamp < cluster.first_seen:
+                cluster.first_seen = timestamp
+            if cluster.last_seen is None or timestamp > cluster.last_seen:
+                cluster.last_seen = timestamp
+        if len(cluster.samples) < self.max_samples and WILDCARD in cluster.tokens:
+            cluster.samples.append([
+                token for template_token, token in zip(cluster.tokens, tokens)
+                if template_token == WILDCARD
+            ])
+        return cluster
+
+    def templates(self, limit=None):
+        """Return the current templates, most frequent first."""
+        clusters = sorted(self._clusters.values(), key=lambda cluster: cluster.count, reverse=True)
+        return [cluster.to_dict() for cluster in clusters[:limit]]
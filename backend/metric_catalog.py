@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class MetricCatalog:
+    """Catalog of published CloudWatch metrics with an inverted dimension index.
+
+    The catalog pages through ListMetrics for a fixed set of namespaces and
+    indexes every metric by ``(namespace, metric name)``, by each
+    ``(dimension name, dimension value)`` pair and by dimension name. Handlers expand queries such
+    as "disk_used_percent for every instance and mount" with ``find``
+    instead of calling ListMetrics on every request.
+
+    Metrics are tuples of ``(namespace, metric_name, dimensions)`` where
+    ``dimensions`` is a sorted tuple of ``(name, value)`` pairs, which is
+    the form ``cloudwatch_batch.metric_query`` accepts.
+    """
+
+    def __init__(self, namespaces, refresh_interval=600, recently_active='PT3H'):
+        self.namespaces = list(namespaces)
+        self.refresh_interval = refresh_interval
+        self.recently_active = recently_active
+        self.last_refresh = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+        self._by_name = {}
+        self._by_dimension = {}
+        self._by_dimension_name = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self, cloudwatch):
+        """Rebuild the catalog from ListMetrics and swap it in atomically."""
+        with self._refresh_lock:
+            by_name = defaultdict(set)
+            by_dimension = defaultdict(set)
+            by_dimension_name = defaultdict(set)
+            count = 0
+            paginator = cloudwatch.get_paginator('list_metrics')
+            for namespace in self.namespaces:
+                kwargs = {'Namespace': namespace}
+                if self.recently_active:
+                    kwargs['RecentlyActive'] = self.recently_active
+                for page in paginator.paginate(**kwargs):
+                    for metric in page['Metrics']:
+                        dimensions = tuple(sorted(
+                            (dimension['Name'], dimension['Value'])
+                            for dimension in metric.get('Dimensions', [])
+                        ))
+                        entry = (metric['Namespace'], metric['MetricName'], dimensions)
+                        by_name[(entry[0], entry[1])].add(entry)
+                        for dimension in dimensions:
+                            by_dimension[dimension].add(entry)
+                            by_dimension_name[dimension[0]].add(entry)
+                        count += 1
+
+            with self._lock:
+                self._by_name = dict(by_name)
+                self._by_dimension = dict(by_dimension)
+                self._by_dimension_name = dict(by_dimension_name)
+                self.last_refresh = time.time()
+            logger.info(f"Metric catalog refreshed: {count} metrics across {len(self.namespaces)} namespaces")
+
+    def ensure_loaded(self, cloudwatch):
+        """Load the catalog on first use and keep it fresh without ``start``.
+
+        The first call blocks on a full refresh. Once the catalog is older
+        than ``refresh_interval`` (e.g. under gunicorn, where no background
+        thread runs), one background refresh is started and callers keep
+        using the current catalog meanwhile.
+        """
+        if self.last_refresh is None:
+            self.refresh(cloudwatch)
+            return
+        with self._lock:
+            if self._refreshing or time.time() - self.last_refresh < self.refresh_interval:
+                return
+            self._refreshing = True
+        threading.Thread(
+            target=self._refresh_once, args=(cloudwatch,), name='metric-catalog-refresh', daemon=True
+        ).start()
+
+    def _refresh_once(self, cloudwatch):
+        try:
+            self.refresh(cloudwatch)
+        except Exception as e:
+            logger.error(f"Metric Catalog Error: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def start(self, cloudwatch):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(cloudwatch,), name='metric-catalog', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, cloudwatch):
+        while not self._stop.is_set():
+            try:
+                self.refresh(cloudwatch)
+            except Exception as e:
+                logger.error(f"Metric Catalog Error: {e}")
+            self._stop.wait(self.refresh_interval)
+
+    def find(self, namespace, metric_name, dimensions=None, require=()):
+        """Return every catalogued metric matching the given filters.
+
+        ``dimensions`` maps dimension names to required values. ``require``
+        lists dimension names that must be present with any value. An empty
+        filter returns every dimension combination of the metric.
+        """
+        with self._lock:
+            matches = self._by_name.get((namespace, metric_name), set())
+            for name, value in (dimensions or {}).items():
+                matches = matches & self._by_dimension.get((name, value), set())
+            for name in require:
+                matches = matches & self._by_dimension_name.get(name, set())
+            return sorted(matches)
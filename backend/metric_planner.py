@@ -0,0 +1,158 @@
+import logging
+import threading
+from collections import deque, namedtuple
+from datetime import datetime, timedelta, timezone
+
+from cloudwatch_batch import fetch_metric_data, metric_query
+
+logger = logging.getLogger(__name__)
+
+# One CloudWatch series a handler needs. ``dimensions`` is a tuple of
+# (name, value) pairs; an empty tuple asks for the namespace-wide aggregate.
+MetricSpec = namedtuple(
+    'MetricSpec',
+    ['namespace', 'metric_name', 'stat', 'minutes', 'dimensions', 'period'],
+    defaults=((), 300)
+)
+
+
+def as_datapoints(series_by_stat):
+    """Merge ``{stat: [(timestamp, value)]}`` into get_metric_statistics-style Datapoints."""
+    by_timestamp = {}
+    for stat, points in series_by_stat.items():
+        for timestamp, value in points:
+            by_timestamp.setdefault(timestamp, {'Timestamp': timestamp})[stat] = value
+    return [by_timestamp[timestamp] for timestamp in sorted(by_timestamp)]
+
+
+def _floor(moment, period):
+    # CloudWatch rounds StartTime down to the period, so slice the same way
+    epoch = int(moment.timestamp()) // period * period
+    return datetime.fromtimestamp(epoch, tz=timezone.utc)
+
+
+class _PlanRequest:
+    def __init__(self, specs, end_time):
+        self.specs = list(specs)
+        self.end_time = end_time
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MetricPlanner:
+    """Merge metric requests from concurrent handlers into packed GetMetricData calls.
+
+    Handlers call ``fetch`` with the MetricSpecs they need. Requests arriving
+    within one scheduling tick are merged: identical series are fetched
+    once, the time window is widened to cover every requester, everything
+    is packed into the fewest GetMetricData calls and the results are
+    sliced back to each requester's own window.
+    """
+
+    def __init__(self, tick=0.05, history_limit=100):
+        self.tick = tick
+        self._lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+        self.ticks = deque(maxlen=history_limit)
+
+    def fetch(self, cloudwatch, specs, end_time=None):
+        """Return ``{spec: [(timestamp, value)]}`` for every requested spec."""
+        request = _PlanRequest(specs, end_time or datetime.now(timezone.utc))
+        with self._lock:
+            self._pending.append(request)
+            if self._timer is None:
+                self._timer = threading.Timer(self.tick, self._run_tick, args=(cloudwatch,))
+                self._timer.daemon = True
+                self._timer.start()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.results
+
+    def fetch_now(self, cloudwatch, specs, end_time=None):
+        """Like ``fetch``, but run at once on ``cloudwatch`` without joining a tick.
+
+        For callers that must not share a call or a client with other
+        requests, e.g. ones bounded by their own deadline.
+        """
+        request = _PlanRequest(specs, end_time or datetime.now(timezone.utc))
+        self._execute(cloudwatch, [request])
+        return request.results
+
+    def _run_tick(self, cloudwatch):
+        with self._lock:
+            requests, self._pending = self._pending, []
+            self._timer = None
+
+        try:
+            self._execute(cloudwatch, requests)
+        except Exception as e:
+            logger.error(f"Metric Planner Error: {e}")
+            for request in requests:
+                request.error = e
+        finally:
+            for request in requests:
+                request.done.set()
+
+    def _execute(self, cloudwatch, requests):
+        # Series identity ignores the window; the window is widened instead
+        series = {}
+        start_time = None
+        end_time = None
+        for request in requests:
+            for spec in request.specs:
+                key = (spec.namespace, spec.metric_name, spec.dimensions, spec.stat, spec.period)
+                series.setdefault(key, f"q{len(series)}")
+                request_start = _floor(request.end_time - timedelta(minutes=spec.minutes), spec.period)
+                start_time = request_start if start_time is None else min(start_time, request_start)
+                end_time = request.end_time if end_time is None else max(end_time, request.end_time)
+
+        queries = [
+            metric_query(query_id, namespace, metric_name, dimensions, period=period, stat=stat)
+            for (namespace, metric_name, dimensions, stat, period), query_id in series.items()
+        ]
+        results, calls = ({}, 0) if not queries else fetch_metric_data(cloudwatch, queries, start_time, end_time)
+
+        requested = 0
+        baseline = 0
+        for request in requests:
+            # Without planning a handler fetched all stats of one series and
+            # window in a single get_metric_statistics call
+            baseline += len({
+                (spec.namespace, spec.metric_name, spec.dimensions, spec.minutes, spec.period)
+                for spec in request.specs
+            })
+            request.results = {}
+            for spec in request.specs:
+                requested += 1
+                query_id = series[(spec.namespace, spec.metric_name, spec.dimensions, spec.stat, spec.period)]
+                window_start = _floor(request.end_time - timedelta(minutes=spec.minutes), spec.period)
+                request.results[spec] = [
+                    (timestamp, value) for timestamp, value in results.get(query_id, [])
+                    if window_start <= timestamp <= request.end_time
+                ]
+
+        saved = baseline - calls
+        self.ticks.append({
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'requesters': len(requests),
+            'requested_series': requested,
+            'unique_series': len(series),
+            'unplanned_calls': baseline,
+            'upstream_calls': calls,
+            'calls_saved': saved
+        })
+        logger.info(
+            f"Metric planner tick: {len(requests)} requesters, {requested} series "
+            f"({len(series)} unique) in {calls} GetMetricData calls, saved {saved}"
+        )
+
+    def stats(self):
+        with self._lock:
+            ticks = list(self.ticks)
+        return {
+            'ticks': ticks,
+            'total_calls_saved': sum(tick['calls_saved'] for tick in ticks)
+        }
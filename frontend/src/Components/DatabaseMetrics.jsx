@@ -1,131 +1,111 @@
-import React from 'react';
-import { Card, CardContent, Typography, Grid, Box } from '@mui/material';
+import React, { useMemo } from 'react';
 import {
-    Chart as ChartJS,
-    CategoryScale,
-    LinearScale,
-    PointElement,
-    LineElement,
-    Title,
-    Tooltip,
-    Legend
-} from 'chart.js';
-import { Line } from 'react-chartjs-2';
+    Card,
+    CardContent,
+    Typography,
+    Grid,
+    Box,
+    Table,
+    TableBody,
+    TableCell,
+    TableContainer,
+    TableHead,
+    TableRow
+} from '@mui/material';
 
-ChartJS.register(
-    CategoryScale,
-    LinearScale,
-    PointElement,
-    LineElement,
-    Title,
-    Tooltip,
-    Legend
+const METRIC_COLUMNS = [
+    { key: 'read_latency', label: 'Read Latency', format: (v) => `${(v * 1000).toFixed(2)} ms` },
+    { key: 'write_latency', label: 'Write Latency', format: (v) => `${(v * 1000).toFixed(2)} ms` },
+    { key: 'read_iops', label: 'Read IOPS', format: (v) => v.toFixed(1) },
+    { key: 'write_iops', label: 'Write IOPS', format: (v) => v.toFixed(1) },
+    { key: 'cpu', label: 'CPU', format: (v) => `${v.toFixed(1)}%` },
+    { key: 'connections', label: 'Connections', format: (v) => Math.round(v) },
+    { key: 'free_storage', label: 'Free Storage', format: (v) => `${(v / Math.pow(1024, 3)).toFixed(1)} GB` }
+];
+
+const formatValue = (column, value) => (
+    value === null || value === undefined ? '-' : column.format(value)
 );
 
 const DatabaseMetrics = ({ metrics }) => {
-    const formatTimestamp = (timestamp) => {
-        return new Date(timestamp).toLocaleTimeString();
-    };
+    // One row per database, slowest reads first
+    const rows = useMemo(() => {
+        const databases = metrics?.databases || [];
+        return databases
+            .map((db, index) => ({
+                ...db,
+                values: METRIC_COLUMNS.reduce((acc, column) => {
+                    acc[column.key] = metrics?.metrics?.[column.key]?.latest?.[index] ?? null;
+                    return acc;
+                }, {})
+            }))
+            .sort((a, b) => (b.values.read_latency ?? -1) - (a.values.read_latency ?? -1));
+    }, [metrics]);
 
     return (
         <Card>
             <CardContent>
                 <Typography variant="h6" gutterBottom>
-                    Database Performance
+                    Database Performance ({rows.length} databases)
                 </Typography>
-                <Grid container spacing={3}>
-                    <Grid item xs={12} md={6}>
-                        <Card>
-                            <CardContent>
-                                <Typography variant="subtitle1">Read Latency</Typography>
-                                <Box height={300}>
-                                    <Line
-                                        options={{
-                                            responsive: true,
-                                            maintainAspectRatio: false,
-                                            plugins: {
-                                                legend: {
-                                                    position: 'top',
-                                                },
-                                                title: {
-                                                    display: true,
-                                                    text: 'Database Read Latency'
-                                                }
-                                            },
-                                            scales: {
-                                                y: {
-                                                    beginAtZero: true,
-                                                    title: {
-                                                        display: true,
-                                                        text: 'Latency (ms)'
-                                                    }
-                                                }
-                                            }
-                                        }}
-                                        data={{
-                                            labels: metrics?.read_latency?.map(m => 
-                                                formatTimestamp(m.Timestamp)) || [],
-                                            datasets: [{
-                                                label: 'Read Latency',
-                                                data: metrics?.read_latency?.map(m => 
-                                                    m.Average * 1000) || [], // Convert to ms
-                                                borderColor: 'rgb(75, 192, 192)',
-                                                tension: 0.1
-                                            }]
-                                        }}
-                                    />
-                                </Box>
-                            </CardContent>
-                        </Card>
-                    </Grid>
-                    <Grid item xs={12} md={6}>
-                        <Card>
-                            <CardContent>
-                                <Typography variant="subtitle1">Write Latency</Typography>
-                                <Box height={300}>
-                                    <Line
-                                        options={{
-                                            responsive: true,
-                                            maintainAspectRatio: false,
-                                            plugins: {
-                                                legend: {
-                                                    position: 'top',
-                                                },
-                                                title: {
-                                                    display: true,
-                                                    text: 'Database Write Latency'
-                                                }
-                                            },
-                                            scales: {
-                                                y: {
-                                                    beginAtZero: true,
-                                                    title: {
-                                                        display: true,
-                                                        text: 'Latency (ms)'
-                                                    }
-                                                }
-                                            }
-                                        }}
-                                        data={{
-                                            labels: metrics?.write_latency?.map(m => 
-                                                formatTimestamp(m.Timestamp)) || [],
-                                            datasets: [{
-                                                label: 'Write Latency',
-                                                data: metrics?.write_latency?.map(m => 
-                                                    m.Average * 1000) || [], // Convert to ms
-                                                borderColor: 'rgb(255, 99, 132)',
-                                                tension: 0.1
-                                            }]
-                                        }}
-                                    />
-                                </Box>
-                            </CardContent>
-                        </Card>
-                    </Grid>
+                <Grid container spacing={2} mb={2}>
+                    {METRIC_COLUMNS.map(column => {
+                        const fleet = metrics?.fleet?.[column.key];
+                        return (
+                            <Grid item xs={12} sm={6} md={3} key={column.key}>
+                                <Card variant="outlined">
+                                    <CardContent>
+                                        <Typography variant="subtitle2" color="textSecondary">
+                                            {column.label}
+                                        </Typography>
+                                        <Typography variant="body2">
+                                            p50: {formatValue(column, fleet?.p50)}
+                                        </Typography>
+                                        <Typography variant="body2">
+                                            p90: {formatValue(column, fleet?.p90)}
+                                        </Typography>
+                                        <Typography variant="body2">
+                                            p99: {formatValue(column, fleet?.p99)}
+                                        </Typography>
+                                    </CardContent>
+                                </Card>
+                            </Grid>
+                        );
+                    })}
                 </Grid>
+                <Box>
+                    <TableContainer sx={{ maxHeight: 480 }}>
+                        <Table stickyHeader size="small">
+                            <TableHead>
+                                <TableRow>
+                                    <TableCell>Database</TableCell>
+                                    <TableCell>Engine</TableCell>
+                                    <TableCell>Status</TableCell>
+                                    {METRIC_COLUMNS.map(column => (
+                                        <TableCell key={column.key} align="right">{column.label}</TableCell>
+                                    ))}
+                                </TableRow>
+                            </TableHead>
+                            <TableBody>
+                                {rows.map(row => (
+                                    <TableRow key={row.id}>
+                                        <TableCell>{row.id}</TableCell>
+                                        <TableCell>{row.engine}</TableCell>
+                                        <TableCell>{row.status}</TableCell>
+                                        {METRIC_COLUMNS.map(column => (
+                                            <TableCell key={column.key} align="right">
+                                                {formatValue(column, row.values[column.key])}
+                                            </TableCell>
+                                        ))}
+                                    </TableRow>
+                                ))}
+                            </TableBody>
+                        </Table>
+                    </TableContainer>
+                </Box>
             </CardContent>
         </Card>
     );
 };
 
-export default DatabaseMetrics; 
\ No newline at end of file
+export default DatabaseMetrics;
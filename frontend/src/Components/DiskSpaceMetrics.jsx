@@ -1,5 +1,17 @@
-import React from 'react';
-import { Card, CardContent, Typography, Grid, Box, LinearProgress } from '@mui/material';
+import React, { useState, useEffect } from 'react';
+import {
+    Card,
+    CardContent,
+    Typography,
+    Grid,
+    Box,
+    LinearProgress,
+    Table,
+    TableBody,
+    TableCell,
+    TableHead,
+    TableRow
+} from '@mui/material';
 import {
     Chart as ChartJS,
     CategoryScale,
@@ -24,7 +36,24 @@ ChartJS.register(
     ArcElement
 );
 
-const DiskSpaceMetrics = ({ metrics }) => {
+const DiskSpaceMetrics = ({ metrics, topN = 10 }) => {
+    const [forecast, setForecast] = useState(null);
+
+    useEffect(() => {
+        const fetchForecast = async () => {
+            try {
+                const response = await fetch(`http://localhost:5001/api/disk-forecast?top=${topN}`);
+                if (!response.ok) throw new Error('Failed to fetch disk forecast');
+                setForecast(await response.json());
+            } catch (error) {
+                console.error('Error fetching disk forecast:', error);
+            }
+        };
+        fetchForecast();
+    }, [topN]);
+
+    const formatDays = (days) => (days === null || days === undefined ? '-' : `${days.toFixed(1)} d`);
+
     const formatBytes = (bytes) => {
         if (bytes === 0) return '0 GB';
         const k = 1024;
@@ -137,6 +166,47 @@ const DiskSpaceMetrics = ({ metrics }) => {
                             </CardContent>
                         </Card>
                     </Grid>
+                    <Grid item xs={12}>
+                        <Card>
+                            <CardContent>
+                                <Typography variant="subtitle1" gutterBottom>
+                                    Volumes Closest to Full
+                                    {forecast?.volumes_analyzed !== undefined &&
+                                        ` (${forecast.volumes_growing} of ${forecast.volumes_analyzed} growing)`}
+                                </Typography>
+                                <Table size="small">
+                                    <TableHead>
+                                        <TableRow>
+                                            <TableCell>Instance</TableCell>
+                                            <TableCell>Mount</TableCell>
+                                            <TableCell align="right">Used</TableCell>
+                                            <TableCell align="right">Growth / day</TableCell>
+                                            <TableCell align="right">Time to full</TableCell>
+                                            <TableCell align="right">95% range</TableCell>
+                                            <TableCell align="right">Confidence</TableCell>
+                                        </TableRow>
+                                    </TableHead>
+                                    <TableBody>
+                                        {forecast?.forecasts?.map(volume => (
+                                            <TableRow key={`${volume.instance_id}:${volume.path}`}>
+                                                <TableCell>{volume.instance_id}</TableCell>
+                                                <TableCell>{volume.path}</TableCell>
+                                                <TableCell align="right">{volume.used_percent}%</TableCell>
+                                                <TableCell align="right">{volume.growth_per_day}%</TableCell>
+                                                <TableCell align="right">{formatDays(volume.days_to_full)}</TableCell>
+                                                <TableCell align="right">
+                                                    {formatDays(volume.days_to_full_low)} - {formatDays(volume.days_to_full_high)}
+                                                </TableCell>
+                                                <TableCell align="right">
+                                                    {Math.round((volume.confidence || 0) * 100)}%
+                                                </TableCell>
+                                            </TableRow>
+                                        ))}
+                                    </TableBody>
+                                </Table>
+                            </CardContent>
+                        </Card>
+                    </Grid>
                 </Grid>
             </CardContent>
         </Card>
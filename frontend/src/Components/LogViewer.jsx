@@ -1,19 +1,34 @@
 import React from 'react';
 import { Card, CardContent, Typography, List, ListItem } from '@mui/material';
 
-const LogViewer = ({ logs }) => (
+// `patterns` is the response of /api/logs/events?mode=patterns; when given,
+// templates are listed with their counts instead of raw lines.
+const LogViewer = ({ logs = [], patterns }) => (
   <Card>
     <CardContent>
       <Typography variant="h6">System Logs</Typography>
-      <List>
-        {logs.map((log, index) => (
-          <ListItem key={index}>
-            <Typography>
-              {new Date(log.timestamp).toLocaleString()}: {log.message}
-            </Typography>
-          </ListItem>
-        ))}
-      </List>
+      {patterns ? (
+        <List>
+          {patterns.templates.map(template => (
+            <ListItem key={template.id}>
+              <Typography>
+                {template.count}x {template.template}
+                {template.last_seen && ` (last seen ${new Date(template.last_seen).toLocaleString()})`}
+              </Typography>
+            </ListItem>
+          ))}
+        </List>
+      ) : (
+        <List>
+          {logs.map((log, index) => (
+            <ListItem key={index}>
+              <Typography>
+                {new Date(log.timestamp).toLocaleString()}: {log.message}
+              </Typography>
+            </ListItem>
+          ))}
+        </List>
+      )}
     </CardContent>
   </Card>
 );
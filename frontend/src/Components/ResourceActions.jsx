@@ -1,37 +1,113 @@
-import React from 'react';
-import { Button, ButtonGroup } from '@mui/material';
+import React, { useState, useEffect, useRef } from 'react';
+import { Button, ButtonGroup, Box, Typography } from '@mui/material';
 import PlayArrowIcon from '@mui/icons-material/PlayArrow';
 import StopIcon from '@mui/icons-material/Stop';
 import RestartAltIcon from '@mui/icons-material/RestartAlt';
 
+const FINISHED = ['succeeded', 'failed', 'partial'];
+// The backend's ACTIONS_API_TOKEN is never built into the bundle: the operator
+// enters it once per browser session and it is kept in sessionStorage
+const TOKEN_KEY = 'actionsApiToken';
+
+const getActionsToken = () => {
+    let token = sessionStorage.getItem(TOKEN_KEY);
+    if (!token) {
+        token = window.prompt('API token for resource actions');
+        if (token) sessionStorage.setItem(TOKEN_KEY, token);
+    }
+    return token;
+};
+
 const ResourceActions = ({ resourceId, resourceType }) => {
-    const handleAction = (action) => {
-        console.log(`${action} action triggered for ${resourceType} ${resourceId}`);
-        // Implement actual AWS actions here
+    const [job, setJob] = useState(null);
+    const [error, setError] = useState(null);
+    const pollRef = useRef(null);
+
+    useEffect(() => () => clearInterval(pollRef.current), []);
+
+    const pollJob = (jobId) => {
+        clearInterval(pollRef.current);
+        pollRef.current = setInterval(async () => {
+            try {
+                const response = await fetch(`http://localhost:5001/api/actions/${jobId}`);
+                if (!response.ok) throw new Error(`Failed to fetch job: ${response.statusText}`);
+                const data = await response.json();
+                setJob(data);
+                if (FINISHED.includes(data.status)) clearInterval(pollRef.current);
+            } catch (err) {
+                setError(err.message);
+                clearInterval(pollRef.current);
+            }
+        }, 3000);
+    };
+
+    const handleAction = async (action) => {
+        try {
+            setError(null);
+            const token = getActionsToken();
+            if (!token) return;
+            const response = await fetch('http://localhost:5001/api/actions', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    Authorization: `Bearer ${token}`
+                },
+                body: JSON.stringify({
+                    action,
+                    resources: [{ id: resourceId, type: resourceType }]
+                })
+            });
+            const data = await response.json();
+            // Ask for the token again on the next action
+            if (response.status === 401) sessionStorage.removeItem(TOKEN_KEY);
+            if (!response.ok) throw new Error(data.error || 'Failed to start action');
+            setJob(data);
+            pollJob(data.id);
+        } catch (err) {
+            console.error(`${action} action failed for ${resourceType} ${resourceId}:`, err);
+            setError(err.message);
+        }
     };
 
+    const busy = job && !FINISHED.includes(job.status);
+    const resourceState = job?.resources?.[0];
+
     return (
-        <ButtonGroup size="small" aria-label="resource actions">
-            <Button 
-                startIcon={<PlayArrowIcon />}
-                onClick={() => handleAction('start')}
-            >
-                Start
-            </Button>
-            <Button 
-                startIcon={<StopIcon />}
-                onClick={() => handleAction('stop')}
-            >
-                Stop
-            </Button>
-            <Button 
-                startIcon={<RestartAltIcon />}
-                onClick={() => handleAction('restart')}
-            >
-                Restart
-            </Button>
-        </ButtonGroup>
+        <Box>
+            <ButtonGroup size="small" aria-label="resource actions" disabled={busy}>
+                <Button
+                    startIcon={<PlayArrowIcon />}
+                    onClick={() => handleAction('start')}
+                >
+                    Start
+                </Button>
+                <Button
+                    startIcon={<StopIcon />}
+                    onClick={() => handleAction('stop')}
+                >
+                    Stop
+                </Button>
+                <Button
+                    startIcon={<RestartAltIcon />}
+                    onClick={() => handleAction('restart')}
+                >
+                    Restart
+                </Button>
+            </ButtonGroup>
+            {job && (
+                <Typography variant="caption" display="block" color="textSecondary">
+                    {job.action}: {job.status}
+                    {resourceState?.detail && ` (${resourceState.detail})`}
+                    {resourceState?.error && ` - ${resourceState.error}`}
+                </Typography>
+            )}
+            {error && (
+                <Typography variant="caption" display="block" color="error">
+                    {error}
+                </Typography>
+            )}
+        </Box>
     );
 };
 
-export default ResourceActions; 
\ No newline at end of file
+export default ResourceActions;